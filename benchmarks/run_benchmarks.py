@@ -0,0 +1,279 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import utils
+from control import SearchControl
+from instance import load_instance
+from solvers import ALGORITHMS, load_algorithm
+
+try:
+    import resource
+except ImportError:  # Not available on Windows: peak RSS is then not recorded
+    resource = None
+
+DATA_DIR = os.path.join(ROOT, "data")
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+SEED = 2021  # Seed of every case, so that scores are reproducible
+TIME_TOLERANCE = 0.25  # Relative slowdown of a timing reported as a regression
+TIME_SLACK = 0.2  # Seconds of slowdown always tolerated: even the best of three runs of a sub-second timing varies by about 0.15 s
+REPEAT = 3  # Runs per case by default; the best timings are kept, as single runs are too noisy to compare
+MEMORY_TOLERANCE = 0.10  # Relative growth of the peak RSS reported as a regression
+
+# Fixed parameters of each algorithm. Budgets are in iterations, not seconds, so that
+# a case explores the same solutions on every machine and its final score is exact.
+BUDGETS = {
+    "hill-climbing": {"iterations": 20000},
+    "simulated-annealing": {"iterations": 20000},
+    "tabu-search": {"iterations": 100, "tabu_tenure": 10},
+    "guided-local-search": {"iterations": 100},
+    "genetic": {"iterations": 50, "parent_selection": "Tournament", "population_size": 20},
+    "genetic-numpy": {"iterations": 50, "parent_selection": "Tournament", "population_size": 20},
+}
+
+# Extra cases run at a realistic population size to watch the peak RSS, with the most
+# RSS in MiB they may use whatever the baseline says: (instance, algorithm) -> (parameters, limit)
+MEMORY_CASES = {
+    ("c_many_ingredients.in", "genetic-numpy"): (
+        {"iterations": 5, "parent_selection": "Tournament", "population_size": 60}, 150),
+}
+
+# Score timed by time_to_target, per instance
+TARGETS = {
+    "a_example": 65,
+    "b_little_bit_of_everything.in": 8000,
+    "c_many_ingredients.in": 200000000,
+    "d_many_pizzas.in": 1400000,
+    "e_many_teams.in": 5500000,
+}
+
+def peak_rss():
+    """
+    Returns the peak resident set size of the current process in MiB, or None if unknown.
+    """
+    try:
+        # Unlike ru_maxrss, VmHWM is not inherited from the parent across fork and exec
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / (1 << 10)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)  # Bytes on macOS, KiB elsewhere
+
+def count_proposals(counter):
+    """
+    Wraps every move proposer of utils.PROPOSERS so that counter[0] counts the moves proposed.
+    """
+    for k, proposer in enumerate(utils.PROPOSERS):
+        def counted(solution, proposer=proposer):
+            counter[0] += 1
+            return proposer(solution)
+        utils.PROPOSERS[k] = counted
+
+def run_case(file_path, algorithm_name, target, parameters):
+    """
+    Runs one benchmark case. It is called in a fresh process so that the peak RSS
+    belongs to this case alone.
+
+    Parameters:
+        file_path (str): Path to the input file.
+        algorithm_name (str): Key of solvers.ALGORITHMS.
+        target (int): Score timed by time_to_target, or None.
+        parameters (dict): Keyword arguments of the algorithm, with its iteration budget.
+
+    Returns:
+        result (dict): Measurements of the case.
+    """
+    algorithm = load_algorithm(algorithm_name)
+    start = time.perf_counter()
+    pizzas, team_sizes = utils.parse_file(file_path)
+    parse_time = time.perf_counter() - start
+
+    moves = [0]
+    count_proposals(moves)
+    control = SearchControl(target=target)
+    random.seed(SEED)
+    # The algorithms print their results and progress bars; only the measurements are kept
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        start = time.perf_counter()
+        solution, score = algorithm(pizzas, team_sizes, control=control, **parameters)
+        search_time = time.perf_counter() - start
+
+    iterations = parameters["iterations"]
+    return {
+        "instance": os.path.basename(file_path),
+        "algorithm": algorithm_name,
+        "parse_time": parse_time,
+        "search_time": search_time,
+        "moves": moves[0],
+        "moves_per_second": moves[0] / search_time if moves[0] else None,
+        "iterations_per_second": iterations / search_time,
+        "target_score": target,
+        "time_to_target": control.target_time,
+        "final_score": score,
+        "feasible": utils.is_feasible(solution, team_sizes),
+        "peak_rss_mb": peak_rss(),
+    }
+
+def best_of(runs):
+    """
+    Merges repeated runs of a case, keeping the best value of every timing.
+    """
+    result = dict(runs[0])
+    for key in ("parse_time", "search_time", "time_to_target", "peak_rss_mb"):
+        values = [run[key] for run in runs if run[key] is not None]
+        result[key] = min(values) if values else None
+    for key in ("moves_per_second", "iterations_per_second"):
+        values = [run[key] for run in runs if run[key] is not None]
+        result[key] = max(values) if values else None
+    return result
+
+def run_suite(instances, algorithms, repeat=REPEAT):
+    """
+    Runs every algorithm on every instance, each case in its own process.
+
+    Parameters:
+        instances (list): Paths of the input files.
+        algorithms (list): Keys of solvers.ALGORITHMS.
+        repeat (int): Runs per case; the best timings are kept.
+
+    Returns:
+        results (dict): Environment and measurements, as written to the JSON output.
+    """
+    context = multiprocessing.get_context("spawn")
+    tokenize_times = {}
+    for file_path in instances:
+        start = time.perf_counter()
+        load_instance(file_path, use_cache=False).build_pizzas()
+        tokenize_times[os.path.basename(file_path)] = time.perf_counter() - start
+        load_instance(file_path)  # Writes the instance cache, so that parse_time measures cached loads
+
+    plan = []
+    for file_path in instances:
+        for algorithm_name in algorithms:
+            plan.append((file_path, algorithm_name, BUDGETS[algorithm_name], None))
+    for file_path in instances:
+        for algorithm_name in algorithms:
+            memory_case = MEMORY_CASES.get((os.path.basename(file_path), algorithm_name))
+            if memory_case:
+                plan.append((file_path, algorithm_name, memory_case[0], memory_case[1]))
+
+    cases = []
+    for file_path, algorithm_name, parameters, memory_limit in plan:
+        target = TARGETS.get(os.path.basename(file_path))
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs.append(executor.submit(run_case, file_path, algorithm_name, target, parameters).result())
+        case = best_of(runs)
+        case["memory_limit_mb"] = memory_limit
+        cases.append(case)
+        print(f"{case['instance']:32} {algorithm_name:20} score {case['final_score']:>12} "
+              f"search {case['search_time']:8.2f}s rss {case['peak_rss_mb'] or 0:7.1f}MiB", file=sys.stderr)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": SEED,
+        "repeat": repeat,
+        "budgets": BUDGETS,
+        "tokenize_time": tokenize_times,
+        "cases": cases,
+    }
+
+def compare(results, baseline):
+    """
+    Compares measurements with a baseline.
+
+    Parameters:
+        results (dict): Output of run_suite.
+        baseline (dict): Earlier output of run_suite.
+
+    Returns:
+        regressions (list): One message per metric that got worse than its tolerance allows.
+    """
+    previous = {(case["instance"], case["algorithm"], case.get("memory_limit_mb")): case for case in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        name = f"{case['instance']} {case['algorithm']}" + (" (memory case)" if case["memory_limit_mb"] else "")
+        if case["memory_limit_mb"] and case["peak_rss_mb"] and case["peak_rss_mb"] > case["memory_limit_mb"]:
+            regressions.append(f"{name}: peak_rss_mb {case['peak_rss_mb']:.1f} above the limit of {case['memory_limit_mb']}")
+        old = previous.get((case["instance"], case["algorithm"], case["memory_limit_mb"]))
+        if old is None:
+            continue
+        if case["final_score"] < old["final_score"]:
+            regressions.append(f"{name}: final_score {old['final_score']} -> {case['final_score']}")
+        if not case["feasible"]:
+            regressions.append(f"{name}: infeasible solution")
+        for key in ("parse_time", "search_time", "time_to_target"):
+            if old[key] is None:
+                continue
+            if case[key] is None:
+                regressions.append(f"{name}: {key} {old[key]:.3f}s -> target not reached")
+            elif case[key] > old[key] * (1 + TIME_TOLERANCE) + TIME_SLACK:
+                regressions.append(f"{name}: {key} {old[key]:.3f}s -> {case[key]:.3f}s")
+        # Compared as the time the moves took at either rate, so that TIME_SLACK applies too
+        if old["moves_per_second"] and case["moves_per_second"] \
+                and case["moves"] / case["moves_per_second"] > case["moves"] / old["moves_per_second"] * (1 + TIME_TOLERANCE) + TIME_SLACK:
+            regressions.append(f"{name}: moves_per_second {old['moves_per_second']:.0f} -> {case['moves_per_second']:.0f}")
+        if old["peak_rss_mb"] and case["peak_rss_mb"] and case["peak_rss_mb"] > old["peak_rss_mb"] * (1 + MEMORY_TOLERANCE):
+            regressions.append(f"{name}: peak_rss_mb {old['peak_rss_mb']:.1f} -> {case['peak_rss_mb']:.1f}")
+    return regressions
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the algorithms on the data instances and compare with a baseline.")
+    parser.add_argument("--instances", nargs="+", metavar="FILE",
+                        help="Input files (default: every file in data/)")
+    parser.add_argument("--algorithms", nargs="+", choices=sorted(ALGORITHMS), default=list(ALGORITHMS),
+                        help="Algorithms to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help=f"Runs per case; the best timings are kept (default: {REPEAT})")
+    parser.add_argument("-o", "--output", help="Path of the JSON results to write")
+    parser.add_argument("--baseline", default=BASELINE, help="Baseline JSON to compare with (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline instead of comparing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    instances = arguments.instances or sorted(os.path.join(DATA_DIR, name) for name in os.listdir(DATA_DIR)
+                                              if os.path.isfile(os.path.join(DATA_DIR, name)))
+    results = run_suite(instances, arguments.algorithms, arguments.repeat)
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+        return 0
+    if not os.path.exists(arguments.baseline):
+        print("No baseline to compare with; run with --save-baseline to create it", file=sys.stderr)
+        return 0
+    with open(arguments.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get("repeat", 1) != arguments.repeat:
+        print(f"Warning: the baseline kept the best of {baseline.get('repeat', 1)} runs per case and this run "
+              f"the best of {arguments.repeat}; timings are not comparable", file=sys.stderr)
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print("REGRESSION", regression)
+    print(f"{len(results['cases'])} cases, {len(regressions)} regressions")
+    return 1 if regressions else 0
+
+# Command line entry point
+if __name__ == "__main__":
+    sys.exit(main())
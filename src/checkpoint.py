@@ -0,0 +1,71 @@
+import os
+import pickle
+import struct
+import time
+from fileio import write_atomic
+
+CHECKPOINT_MAGIC = b"EMPC"
+CHECKPOINT_VERSION = 2
+CHECKPOINT_INTERVAL = 60.0  # Seconds between two checkpoints
+
+_HEADER = struct.Struct("<4sI")
+
+
+def load_checkpoint(path):
+    """
+    Reads a checkpoint written by Checkpoint.save.
+
+    Parameters:
+        path (str): Checkpoint file.
+
+    Returns:
+        state (dict): Saved search state.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version = _HEADER.unpack_from(data, 0)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is not a checkpoint of the current version")
+    return pickle.loads(data[_HEADER.size:])
+
+
+class Checkpoint:
+    """
+    Periodic checkpoints of a search, passed to an algorithm through its checkpoint parameter.
+
+    The state is a dict holding the iteration counter, the random generator state and the
+    algorithm's own state, with solutions packed by utils.encode_solution, and the learnt
+    state of the operator scheduler if the run has one. Each algorithm
+    saves it when due() is True and restores it at start-up when the run is resumed, so a
+    resumed run with an iteration budget continues exactly as if it had never stopped.
+    Score histories used for plotting are not saved.
+    """
+    def __init__(self, path, interval=CHECKPOINT_INTERVAL, resume=False):
+        """
+        Parameters:
+            path (str): Checkpoint file, overwritten atomically at each save
+            interval (float): Seconds between two saves
+            resume (bool): If True and path exists, the algorithm restores its state from it
+        """
+        self.path = path
+        self.interval = interval
+        self.state = load_checkpoint(path) if resume and os.path.exists(path) else None
+        self.next_save = time.monotonic() + interval
+
+    def restore(self, algorithm):
+        """
+        Returns the saved state of algorithm, or None when the run starts from scratch.
+        """
+        state, self.state = self.state, None
+        if state is not None and state["algorithm"] != algorithm:
+            raise ValueError(f"{self.path} is a checkpoint of {state['algorithm']}, not of {algorithm}")
+        return state
+
+    def due(self):
+        return time.monotonic() >= self.next_save
+
+    def save(self, algorithm, state):
+        state["algorithm"] = algorithm
+        write_atomic(self.path, _HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION)
+                     + pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+        self.next_save = time.monotonic() + self.interval
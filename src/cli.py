@@ -0,0 +1,209 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import signal
+import sys
+import time
+import utils
+from checkpoint import CHECKPOINT_INTERVAL, Checkpoint
+from control import SearchControl
+from profiling import Profiler
+from scheduler import POLICIES, OperatorScheduler
+from solvers import ALGORITHMS, load_algorithm
+
+def parse_arguments(argv=None):
+    """
+    Parses the command line.
+
+    Parameters:
+        argv (list): Arguments, without the program name. Defaults to sys.argv[1:].
+
+    Returns:
+        arguments (argparse.Namespace): Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Solve an Even More Pizza instance without the graphical interface.")
+    parser.add_argument("instance", help="Path to the input file")
+    parser.add_argument("algorithm", choices=sorted(ALGORITHMS), help="Algorithm to run")
+    parser.add_argument("-i", "--iterations", type=int,
+                        help="Number of iterations (default: 10, or unlimited with --time-budget)")
+    parser.add_argument("--time-budget", type=float,
+                        help="Seconds to run; the best solution found so far is returned when it ends")
+    parser.add_argument("--report-interval", type=float,
+                        help="Print the best score found so far every this many seconds")
+    parser.add_argument("--checkpoint", metavar="PATH", help="Save the search state to PATH periodically")
+    parser.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL,
+                        help=f"Seconds between two checkpoints (default: {CHECKPOINT_INTERVAL:g})")
+    parser.add_argument("--resume", action="store_true", help="Continue the search saved in the --checkpoint file")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Write the run report (operator counters and phase timings) to PATH as JSON, or to stdout with -")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("-o", "--output", help="Path of the solution file to write")
+    output.add_argument("--output-dir", metavar="DIR",
+                        help="Write the solution to DIR, in a file named after the instance, algorithm and seed "
+                             "(a seed is drawn if --seed is not given)")
+    parser.add_argument("--seed", type=int, help="Seed of the random number generator")
+    parser.add_argument("--initializer", choices=sorted(utils.INITIALIZERS), default="Random", help="Constructor of the initial solution")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Hide progress bars and the algorithms' own output; only the summary is printed")
+    parser.add_argument("--plot", action="store_true", help="Show the performance graph at the end (needs matplotlib)")
+    parser.add_argument("--restarts", type=int, default=1, help="Number of independent runs; the best solution is kept (default: 1)")
+    parser.add_argument("--workers", type=int, help="Worker processes used by --restarts (default: one per CPU)")
+
+    group = parser.add_argument_group("algorithm parameters")
+    group.add_argument("--improving-iterations", action="store_true", help="Hill climbing: count iterations without improving")
+    group.add_argument("--operator-selection", choices=["uniform"] + POLICIES, default="uniform",
+                       help="Hill climbing, simulated annealing and genetic algorithm: how neighbour operators are "
+                            "chosen, uniformly or adaptively by a bandit policy (default: uniform)")
+    group.add_argument("--cooling-option", type=int, default=1, help="Simulated annealing: cooling schedule (default: 1)")
+    group.add_argument("--target-acceptance", type=float, default=0.5,
+                       help="Simulated annealing: acceptance rate of worsening moves at the start, "
+                            "strictly between 0 and 1 (default: 0.5)")
+    group.add_argument("--reheat", action="store_true", help="Simulated annealing: reheat when the best score stagnates")
+    group.add_argument("--tabu-tenure", type=int, default=10, help="Tabu search: tabu tenure (default: 10)")
+    group.add_argument("--aspiration", choices=["best", "improving", "none"], default="best",
+                       help="Tabu search: when a tabu move is allowed anyway (default: best)")
+    group.add_argument("--neighbourhood-size", type=int, default=100,
+                       help="Tabu search and guided local search: candidate moves sampled per iteration (default: 100)")
+    group.add_argument("--alpha", type=float, default=0.3, help="Guided local search: penalty weight factor (default: 0.3)")
+    group.add_argument("--population", type=int, default=60, help="Genetic algorithm: population size (default: 60)")
+    group.add_argument("--selection", choices=["Tournament", "Roulette"], default="Tournament", help="Genetic algorithm: parent selection")
+    group.add_argument("--tournament-size", type=int, default=3, help="Genetic algorithm: individuals drawn per tournament (default: 3)")
+    group.add_argument("--islands", type=int, default=1, help="Genetic algorithm: number of islands, one process each (default: 1)")
+    group.add_argument("--migration-interval", type=int, default=10, help="Genetic algorithm: generations between migrations (default: 10)")
+    group.add_argument("--migrants", type=int, default=2, help="Genetic algorithm: individuals sent per migration (default: 2)")
+    group.add_argument("--topology", choices=["ring", "random"], default="ring", help="Genetic algorithm: migration topology")
+    arguments = parser.parse_args(argv)
+    if arguments.iterations is None and arguments.time_budget is None:
+        arguments.iterations = 10
+    if arguments.output_dir:
+        if arguments.seed is None:
+            arguments.seed = random.getrandbits(32)
+        arguments.output = utils.output_path(arguments.instance, arguments.algorithm, arguments.seed, arguments.output_dir)
+    if arguments.resume and not arguments.checkpoint:
+        parser.error("--resume needs --checkpoint")
+    if arguments.checkpoint and (arguments.restarts > 1 or arguments.islands > 1):
+        parser.error("--checkpoint only supports single runs")
+    if arguments.profile and (arguments.restarts > 1 or arguments.islands > 1):
+        parser.error("--profile only supports single runs")
+    if arguments.operator_selection != "uniform" and arguments.islands > 1:
+        parser.error("--operator-selection does not support --islands")
+    if not 0 < arguments.target_acceptance < 1:
+        parser.error("--target-acceptance must be strictly between 0 and 1")
+    return arguments
+
+def algorithm_parameters(arguments):
+    """
+    Collects the keyword arguments of the chosen algorithm.
+
+    Parameters:
+        arguments (argparse.Namespace): Parsed arguments.
+
+    Returns:
+        parameters (dict): Keyword arguments for the algorithm entry point.
+    """
+    parameters = {"iterations": arguments.iterations, "initializer": arguments.initializer, "plot": arguments.plot}
+    if arguments.operator_selection != "uniform" and arguments.algorithm in ("hill-climbing", "simulated-annealing", "genetic"):
+        parameters["scheduler"] = OperatorScheduler(arguments.operator_selection)
+    if arguments.algorithm == "hill-climbing":
+        parameters["improving_iterations"] = arguments.improving_iterations
+    elif arguments.algorithm == "simulated-annealing":
+        parameters["cooling_option"] = arguments.cooling_option
+        parameters["target_acceptance"] = arguments.target_acceptance
+        parameters["reheat"] = arguments.reheat
+    elif arguments.algorithm == "tabu-search":
+        parameters["tabu_tenure"] = arguments.tabu_tenure
+        parameters["aspiration"] = arguments.aspiration
+        parameters["neighbourhood_size"] = arguments.neighbourhood_size
+    elif arguments.algorithm == "guided-local-search":
+        parameters["neighbourhood_size"] = arguments.neighbourhood_size
+        parameters["alpha"] = arguments.alpha
+    elif arguments.algorithm in ("genetic", "genetic-numpy"):
+        parameters["parent_selection"] = arguments.selection
+        parameters["population_size"] = arguments.population
+        parameters["tournament_size"] = arguments.tournament_size
+    if arguments.algorithm == "genetic" and arguments.quiet:
+        parameters["progress"] = False
+    return parameters
+
+def run(arguments, profiler=None):
+    """
+    Runs the chosen algorithm on the chosen instance and writes its solution to arguments.output, if set.
+
+    Parameters:
+        arguments (argparse.Namespace): Parsed arguments.
+        profiler (Profiler): Times the parsing and the algorithm, for single runs only.
+
+    Returns:
+        solution (Solution): Solution returned by the algorithm.
+        score (int): Score of the solution.
+    """
+    parameters = algorithm_parameters(arguments)
+    if arguments.restarts > 1:
+        from multistart import multi_start
+        parameters["plot"] = False
+        return multi_start(arguments.instance, arguments.algorithm, arguments.restarts, arguments.workers, arguments.seed,
+                           arguments.time_budget, arguments.output, **parameters)
+
+    if arguments.algorithm == "genetic" and arguments.islands > 1:
+        from island import island_genetic_algorithm
+        return island_genetic_algorithm(arguments.instance, arguments.iterations, arguments.selection, arguments.population,
+                                        arguments.islands, arguments.migration_interval, arguments.migrants,
+                                        arguments.topology, arguments.initializer, arguments.seed,
+                                        arguments.tournament_size, arguments.time_budget, arguments.output)
+
+    # Ctrl+C stops the search, which then returns its best solution so far
+    control = SearchControl(arguments.time_budget, callback=report_progress if arguments.report_interval else None,
+                            interval=arguments.report_interval or 0)
+    signal.signal(signal.SIGINT, lambda signum, frame: control.cancel())
+    parameters["control"] = control
+    parameters["output"] = arguments.output
+    if arguments.checkpoint:
+        parameters["checkpoint"] = Checkpoint(arguments.checkpoint, arguments.checkpoint_interval, arguments.resume)
+
+    algorithm = load_algorithm(arguments.algorithm)
+    if profiler:
+        profiler.begin("parse")
+    pizzas, team_sizes = utils.parse_file(arguments.instance)
+    if profiler:
+        solution, score, _ = algorithm(pizzas, team_sizes, profiler=profiler, **parameters)
+        return solution, score
+    return algorithm(pizzas, team_sizes, **parameters)
+
+def report_progress(solution, score):
+    print("Best so far:", score, file=sys.stderr)
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    if arguments.seed is not None:
+        random.seed(arguments.seed)
+
+    start_time = time.time()
+    profiler = Profiler() if arguments.profile else None
+    with contextlib.ExitStack() as stack:
+        if arguments.quiet:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        solution, score = run(arguments, profiler)
+    if arguments.output:
+        print("Solution written to", arguments.output)
+    print("Score:", score)
+    print("Execution time:", time.time() - start_time, "seconds")
+    if profiler:
+        write_report(profiler.report(), arguments.profile)
+    return 0
+
+def write_report(report, path):
+    """
+    Writes a run report as JSON to path, or to stdout if path is "-".
+    """
+    if path == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+
+# Command line entry point
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import threading
+import time
+
+REPORT_INTERVAL = 1.0  # Seconds between two best-so-far callbacks
+
+class SearchControl:
+    """
+    Run-time limits of a search, checked by the algorithms once per iteration.
+
+    A search stops at its deadline or as soon as cancel() is called, possibly from another
+    thread, and returns the best solution found so far. If a callback is given it is called
+    as callback(solution, score) with the best-so-far solution every interval seconds; the
+    solution belongs to the search and must be copied or encoded if it is kept.
+    With a target score, target_time records when the best score first reached it.
+    """
+    def __init__(self, time_budget=None, deadline=None, callback=None, interval=REPORT_INTERVAL, cancel_event=None,
+                 target=None):
+        """
+        Parameters:
+            time_budget (float): Seconds the search may run, counted from now
+            deadline (float): time.monotonic() value at which the search stops; the earlier
+                of deadline and the end of time_budget is used
+            callback (function): Called as callback(solution, score) with the best-so-far solution
+            interval (float): Seconds between two callbacks
+            cancel_event (Event): Cancellation token; a threading.Event is created if None.
+                A multiprocessing.Event lets another process cancel the search.
+            target (int): Score timed by target_time
+        """
+        self.start_time = time.monotonic()
+        if time_budget is not None:
+            end = self.start_time + time_budget
+            deadline = end if deadline is None else min(deadline, end)
+        self.deadline = deadline
+        self.callback = callback
+        self.interval = interval
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.next_report = self.start_time + interval
+        self.target = target
+        self.target_time = None  # Seconds from the start until the best score reached target
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def should_stop(self):
+        """
+        Returns True once the search is cancelled or past its deadline.
+        """
+        if self.cancel_event.is_set():
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def progress(self):
+        """
+        Returns the share of the time budget used, from 0 to 1, or None without a deadline.
+        """
+        if self.deadline is None:
+            return None
+        return min(1.0, (time.monotonic() - self.start_time) / max(self.deadline - self.start_time, 1e-9))
+
+    def due(self, best_score=None):
+        """
+        Returns True when the best-so-far callback should be called. Algorithms check this
+        before building their best solution, so that no work is done between callbacks.
+        They pass their best score, which only costs a comparison and times the target.
+        """
+        if best_score is not None and self.target_time is None and self.target is not None \
+                and best_score >= self.target:
+            self.target_time = time.monotonic() - self.start_time
+        return self.callback is not None and time.monotonic() >= self.next_report
+
+    def report(self, solution, score):
+        self.next_report = time.monotonic() + self.interval
+        self.callback(solution, score)
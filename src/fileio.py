@@ -0,0 +1,25 @@
+import os
+
+
+def write_atomic(path, data):
+    """
+    Writes data to path through a temporary file in the same folder, so that path holds
+    either its previous contents or all of data even if the process dies while writing.
+
+    Parameters:
+        path (str): Destination file.
+        data (bytes): Contents to write.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
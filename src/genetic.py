@@ -1,246 +1,337 @@
+import sys
 import utils  
-import copy  
-import matplotlib.pyplot as plt 
 import random  
-from tqdm.auto import tqdm  
-import numpy as np  
+from bisect import bisect_right
+from itertools import accumulate, count
+from control import SearchControl
+from models import Delivery, PizzaPool, Solution
 
 
 MUTATION_PROB = 0.05  # Probability of mutation
+TOURNAMENT_SIZE = 3  # Individuals drawn per tournament
 
-def genetic_algorithm(pizzas, team_sizes, iterations, parent_selection, population_size=60):
+def genetic_algorithm(pizzas, team_sizes, iterations, parent_selection, population_size=60, initializer="Random", plot=False,
+                      tournament_size=TOURNAMENT_SIZE, control=None, checkpoint=None, profiler=None,
+                      scheduler=None, output=None, progress=None):
     """
     Performs Genetic Algorithm for optimizing pizza delivery routes.
     
     Parameters:
         pizzas (list): List of pizzas
         team_sizes (list): List of team sizes
-        iterations (int): Number of iterations
+        iterations (int): Number of iterations, or None to run until control stops the search
         parent_selection (str): Strategy for parent selection
         population_size (int): Size of the population (default is 60)
+        initializer (str): Constructor of the initial solution ("Random" or "Greedy")
+        plot (bool): If True, shows the performance graph when the search ends
+        tournament_size (int): Individuals drawn per tournament when parent_selection is "Tournament"
+        control (SearchControl): Deadline, cancellation and best-so-far callback of the run
+        checkpoint (Checkpoint): Periodic checkpoints of the population, restored if the run is resumed
+        profiler (Profiler): Collects operator counters and phase timings of the run
+        scheduler (OperatorScheduler): Adaptive choice of the mutation operators; they are drawn uniformly if None
+        output (str): Path of the solution file, written atomically when the search ends, or None
+        progress (bool): If True, shows a progress bar on stderr; by default only when stderr is a terminal
         
     Returns:
         final_solution (object): Best solution found
         final_score (float): Score of the best solution
+        report (dict): Run report of the profiler, returned only if profiler is given
     """
-    # Initialize population
-    population = initialize_population(pizzas, team_sizes, population_size)
+    control = control or SearchControl()
+    if profiler:
+        profiler.begin("init")
     # Lists to store scores and other metrics
     best_scores = []
-    all_scores = []
     avg_scores = []
-    infeasible_points = 0
-
-    # Evaluate initial population
-    for individual in population:
-        all_scores.append(utils.evaluation_function(individual))
 
+    state = checkpoint.restore("genetic_algorithm") if checkpoint else None
+    if state is None:
+        # Initialize population
+        population = initialize_population(pizzas, team_sizes, population_size, initializer)
+        start = 0
+    else:
+        random.setstate(state["random"])
+        population = [utils.decode_solution(data, pizzas) for data in state["population"]]
+        start = state["iteration"]
+        if scheduler and state["scheduler"]:
+            scheduler.setstate(state["scheduler"])
+
+    # Evaluate initial population. all_scores is the fitness cache of the population:
+    # evolve keeps it in sync, so it is never recomputed from the individuals
+    all_scores = [utils.evaluation_function(individual) for individual in population]
+
+    if profiler:
+        profiler.begin("search")
+    generations = range(start, iterations) if iterations is not None else count(start)
+    if progress if progress is not None else sys.stderr.isatty():
+        from tqdm.auto import tqdm  # Only imported for a progress bar, as the import alone takes about 0.1 s
+        generations = tqdm(generations, initial=start, total=iterations)
     # Main loop for genetic algorithm
-    for i in tqdm(range(iterations)):
-        # Select parents
-        p1, p2 = select_parents(population, parent_selection)
-
-        # Calculate average score and track best solution
-        avg_score = np.mean(all_scores)
-        avg_scores.append(avg_score)
-        best_solution = max(population, key=lambda x: utils.evaluation_function(x))
-        best_scores.append(utils.evaluation_function(best_solution))
-
-        # Perform crossover
-        child = crossover(p1, p2)
-
-        # Check feasibility of child solution
-        if utils.is_feasible(child, team_sizes.copy()):
-            # Replace random individual in population with child
-            random_index = random.randint(0, population_size - 1)
-            population[random_index] = child
-            all_scores[random_index] = utils.evaluation_function(child)
-        else:
-            infeasible_points += 1
-
-        # Apply mutation to the population
-        population, mutated = mutate(population)
+    for i in generations:
+        if control.should_stop():
+            break
+        # Track the average and best scores for the graph
+        if plot:
+            avg_scores.append(sum(all_scores) / len(all_scores))
+            best_scores.append(max(all_scores))
+
+        evolve(population, all_scores, team_sizes, parent_selection, tournament_size, scheduler)
+        if control.due(max(all_scores)):
+            best_index = max(range(len(population)), key=lambda i: all_scores[i])
+            control.report(population[best_index], all_scores[best_index])
+        if checkpoint and checkpoint.due():
+            checkpoint.save("genetic_algorithm", {
+                "random": random.getstate(), "iteration": i + 1,
+                "population": [utils.encode_solution(individual) for individual in population],
+                "scheduler": scheduler.getstate() if scheduler else None})
+
+    if profiler:
+        profiler.end()
 
     # Calculate final best solution and score
-    best_solution = max(population, key=lambda x: utils.evaluation_function(x))
-    best_score = utils.evaluation_function(best_solution)
+    best_index = max(range(len(population)), key=lambda i: all_scores[i])
+    best_solution = population[best_index]
+    best_score = all_scores[best_index]
     print(best_score)
-    print(infeasible_points)
+
+    if output:
+        utils.write_solution(best_solution, output, profiler)
 
     # Display performance graph
-    show_graph(best_scores, avg_scores)
+    if plot:
+        show_graph(best_scores, avg_scores)
 
+    if profiler:
+        return best_solution, best_score, profiler.report()
     return best_solution, best_score
 
 
-def initialize_population(pizzas, team_sizes, population_size):
+def evolve(population, all_scores, team_sizes, parent_selection, tournament_size=TOURNAMENT_SIZE, scheduler=None):
     """
-    Initializes the population with random delivery arrangements.
+    Runs one generation: selects two parents, replaces a random individual with
+    their child if it is not already in the population and then mutates the
+    population in place.
+    
+    Parameters:
+        population (list): Population of solutions
+        all_scores (list): Score of each individual, updated in place
+        team_sizes (list): List of team sizes
+        parent_selection (str): Strategy for parent selection
+        tournament_size (int): Individuals drawn per tournament
+        scheduler (OperatorScheduler): Adaptive choice of the mutation operators, or None
+    """
+    # Select parents
+    p1, p2 = select_parents(population, parent_selection, all_scores, tournament_size)
+
+    # Perform crossover; the child is repaired, so it is always feasible
+    child = crossover(p1, p2, team_sizes)
+
+    # Replace random individual in population with child, unless the child is a copy
+    # of an individual: duplicates would only reduce the diversity of the population
+    if not any(individual.fingerprint == child.fingerprint for individual in population):
+        random_index = random.randint(0, len(population) - 1)
+        population[random_index] = child
+        all_scores[random_index] = utils.evaluation_function(child)
+
+    # Apply mutation to the population
+    mutate(population, all_scores, scheduler)
+
+
+def initialize_population(pizzas, team_sizes, population_size, initializer="Random"):
+    """
+    Initializes the population with delivery arrangements built by the chosen constructor.
     
     Parameters:
         pizzas (list): List of pizzas
         team_sizes (list): List of team sizes
         population_size (int): Size of the population
+        initializer (str): Constructor of the initial solution ("Random" or "Greedy")
         
     Returns:
         population (list): Initial population of solutions
     """
     population = []
     for _ in range(population_size):
-        population.append(utils.randomize_deliveries(pizzas, team_sizes.copy()))
+        population.append(utils.initial_solution(pizzas, team_sizes, initializer))
     return population
 
 
-def select_parents(population, parent_selection):
+def select_parents(population, parent_selection, scores=None, tournament_size=TOURNAMENT_SIZE):
     """
     Selects parents based on chosen strategy.
     
     Parameters:
         population (list): Population of solutions
         parent_selection (str): Strategy for parent selection
+        scores (list): Cached score of each individual (read from the individuals if None)
+        tournament_size (int): Individuals drawn per tournament
         
     Returns:
         parent1 (object): First parent solution
         parent2 (object): Second parent solution
     """
+    if scores is None:
+        scores = [utils.evaluation_function(solution) for solution in population]
     if parent_selection == "Tournament":
-        return tournament(population)
-    return roulette(population)
+        return tournament(population, scores, tournament_size)
+    return roulette(population, scores)
 
 
-def roulette(population):
+def cumulative_scores(scores):
+    """
+    Builds the roulette wheel of a population, shared by both parent draws.
+    
+    Parameters:
+        scores (list): Cached score of each individual
+        
+    Returns:
+        cumulative (list): Running sum of the scores
+    """
+    return list(accumulate(scores))
+
+
+def spin(cumulative, pointer):
+    """
+    Returns the index of the individual whose slice of the wheel contains pointer (binary search).
+    """
+    if cumulative[-1] <= 0:
+        return random.randrange(len(cumulative))  # All scores are zero: every individual is equally likely
+    return min(bisect_right(cumulative, pointer), len(cumulative) - 1)
+
+
+def roulette(population, scores):
     """
     Performs roulette wheel selection for parent solutions.
     
     Parameters:
         population (list): Population of solutions
+        scores (list): Cached score of each individual
         
     Returns:
         parent1 (object): First parent solution
         parent2 (object): Second parent solution
     """
-    scores = []
-    for solution in population:
-        score = utils.evaluation_function(solution)
-        scores.append(score)
-
-    total_scores = sum(scores)
-    probabilities = [score / total_scores for score in scores]
-
-    rand1 = random.random()
-    cumulative_probability = 0
-    for i, probability in enumerate(probabilities):
-        cumulative_probability += probability
-        if rand1 <= cumulative_probability:
-            parent1 = population[i]
-
-    rand2 = random.random()
-    cumulative_probability = 0
-    for j, probability2 in enumerate(probabilities):
-        cumulative_probability += probability2
-        if rand2 <= cumulative_probability:
-            parent2 = population[j]
-
+    cumulative = cumulative_scores(scores)
+    parent1 = population[spin(cumulative, random.random() * cumulative[-1])]
+    parent2 = population[spin(cumulative, random.random() * cumulative[-1])]
     return parent1, parent2
 
 
-def tournament(population):
+def tournament(population, scores, tournament_size=TOURNAMENT_SIZE):
     """
-    Performs tournament selection for parent solutions.
+    Performs k-tournament selection for parent solutions: each parent is the
+    best of tournament_size individuals drawn at random.
     
     Parameters:
         population (list): Population of solutions
+        scores (list): Cached score of each individual
+        tournament_size (int): Individuals drawn per tournament
         
     Returns:
         parent1 (object): First parent solution
         parent2 (object): Second parent solution
     """
-    scores = []
-    selected_individuals = []
     population_size = len(population)
-    for solution in population:
-        score = utils.evaluation_function(solution)
-        scores.append(score)
-    while len(selected_individuals) < 2:
-        tournament = random.sample(range(population_size), population_size)
-        winners_indices = sorted(tournament, key=lambda i: scores[i], reverse=True)[:2]
-        selected_individuals.extend([population[i] for i in winners_indices])
-
-    return selected_individuals[0], selected_individuals[1]
-
-
-def crossover(p1, p2):
+    winners = []
+    for _ in range(2):
+        winner = random.randrange(population_size)
+        for _ in range(tournament_size - 1):
+            entrant = random.randrange(population_size)
+            if scores[entrant] > scores[winner]:
+                winner = entrant
+        winners.append(population[winner])
+    return winners[0], winners[1]
+
+
+def crossover(p1, p2, team_sizes):
     """
     Performs crossover between parent solutions to generate a child solution.
+    Delivery i of the child is delivery i of a random parent; the child is then
+    repaired so that it is always feasible.
     
     Parameters:
         p1 (object): First parent solution
         p2 (object): Second parent solution
+        team_sizes (list): List of team sizes
         
     Returns:
         child (object): Child solution generated by crossover
     """
-    child = copy.deepcopy(p1)
-    max_length = min(len(p1.solution), len(p2.solution))
-
-    assigned_pizzas = set(pizza.index for delivery in p1.solution for pizza in delivery.pizzas)
-
-    for i in range(max_length):
-        parent = p1 if random.random() > 0.5 else p2
-
-        pizza_free = True
-        space_free = True
-
-        if i < len(parent.solution):
-
-            for pizza in parent.solution[i].pizzas:
-                if pizza.index in assigned_pizzas:
-                    pizza_free = False
-                    break
-            if pizza_free:
-                for pizza in parent.solution[i].pizzas:
-                    assigned_pizzas.add(pizza.index)
-
-            if pizza_free:
-                if parent.solution[i].team_size == 2:
-                    if child.free[0] == 0 and child.solution[i].team_size == 2 and parent.solution[i].team_size == 2:
-                        pass
-                    elif child.free[0] > 0:
-                        child.free[0] -= 1
-                        child.free[parent.solution[i].team_size - 2] += 1
-                    else:
-                        space_free = False
-
-                if parent.solution[i].team_size == 3:
-                    if child.free[1] == 0 and child.solution[i].team_size == 3 and parent.solution[i].team_size == 3:
-                        pass
-                    elif child.free[1] > 0:
-                        child.free[1] -= 1
-                        child.free[parent.solution[i].team_size - 2] += 1
-                    else:
-                        space_free = False
-
-                if parent.solution[i].team_size == 4:
-                    if child.free[2] == 0 and child.solution[i].team_size == 4 and parent.solution[i].team_size == 4:
-                        pass
-                    elif child.free[2] > 0:
-                        child.free[2] -= 1
-                        child.free[parent.solution[i].team_size - 2] += 1
-                    else:
-                        space_free = False
-
-            if pizza_free and space_free:
-                child.solution[i] = parent.solution[i]
-
-    return child
-
-
-def mutate(population):
+    deliveries = []
+    for i in range(max(len(p1.solution), len(p2.solution))):
+        if i >= len(p2.solution) or (i < len(p1.solution) and random.random() > 0.5):
+            deliveries.append(p1.solution[i])
+        else:
+            deliveries.append(p2.solution[i])
+
+    pizzas = [pizza for delivery in p1.solution for pizza in delivery.pizzas]
+    pizzas.extend(p1.unused_pizzas)
+    return repair(deliveries, pizzas, team_sizes)
+
+
+def repair(deliveries, pizzas, team_sizes):
+    """
+    Builds a feasible solution from parent deliveries. A pizza already delivered by
+    an earlier delivery is swapped for a random unused pizza, and a delivery of a
+    size with no team left is resized to a size that has teams left by taking or
+    giving back unused pizzas. Deliveries that cannot be repaired are dropped.
+    Deliveries that need no repair are shared with the parents, since deliveries never change.
+    
+    Parameters:
+        deliveries (list): Parent deliveries, in child order
+        pizzas (list): Every pizza of the instance
+        team_sizes (list): List of team sizes
+        
+    Returns:
+        child (object): Feasible child solution
+    """
+    delivered = bytearray(max((pizza.index for pizza in pizzas), default=0) + 1)
+    kept = []
+    for delivery in deliveries:
+        fresh = []
+        for pizza in delivery.pizzas:
+            if not delivered[pizza.index]:
+                delivered[pizza.index] = 1
+                fresh.append(pizza)
+        kept.append((delivery, fresh))
+    unused = PizzaPool(pizza for pizza in pizzas if not delivered[pizza.index])
+
+    free = list(team_sizes)
+    child_deliveries = []
+    for delivery, fresh in kept:
+        team_size = delivery.team_size
+        if free[team_size - 2] == 0:
+            # Prefer the largest size with a team left that the unused pizzas can fill
+            team_size = next((size for size in (4, 3, 2)
+                              if free[size - 2] > 0 and size - len(fresh) <= len(unused)), 0)
+        if team_size == 0 or team_size - len(fresh) > len(unused):
+            unused.extend(fresh)
+            continue
+
+        free[team_size - 2] -= 1
+        if team_size == delivery.team_size and len(fresh) == team_size:
+            child_deliveries.append(delivery)
+            continue
+        while len(fresh) > team_size:
+            unused.add(fresh.pop(random.randrange(len(fresh))))
+        while len(fresh) < team_size:
+            pizza = unused.choice()
+            unused.remove(pizza)
+            fresh.append(pizza)
+        child_deliveries.append(Delivery(team_size, fresh))
+
+    return Solution(child_deliveries, unused, free[0], free[1], free[2])
+
+
+def mutate(population, all_scores=None, scheduler=None):
     """
     Applies mutation to the population with a certain probability.
+    Mutated individuals update their score through the move delta.
     
     Parameters:
         population (list): Population of solutions
+        all_scores (list): Cached score of each individual, updated in place if given
+        scheduler (OperatorScheduler): Adaptive choice of the mutation operators, or None for a uniform choice
         
     Returns:
         population (list): Updated population after mutation
@@ -249,7 +340,10 @@ def mutate(population):
     mutated = False
     for i in range(len(population)):
         if random.random() < MUTATION_PROB:
-            population[i], _ = utils.generate_neighbour_random(population[i])
+            population[i], score = utils.generate_neighbour_random(population[i], utils.evaluation_function(population[i]),
+                                                                     scheduler)
+            if all_scores is not None:
+                all_scores[i] = score
             mutated = True
     return population, mutated
 
@@ -262,6 +356,8 @@ def show_graph(best_scores, avg_scores):
         best_scores (list): List of best scores at each iteration
         avg_scores (list): List of average scores at each iteration
     """
+    import matplotlib.pyplot as plt
+
     plt.plot(range(1, len(best_scores) + 1), best_scores, label='Best Individual Score')
     plt.plot(range(1, len(avg_scores) + 1), avg_scores, linestyle='--', color='red', label='Average Population Score')
     plt.xlabel('Iteration')
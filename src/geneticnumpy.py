@@ -0,0 +1,295 @@
+import random
+import numpy as np
+import utils
+from itertools import count
+from control import SearchControl
+from models import Delivery, Solution
+
+
+MUTATION_PROB = 0.05  # Probability of mutating each child
+TOURNAMENT_SIZE = 3  # Individuals drawn per tournament
+ELITISM = 1  # Best individuals copied unchanged into the next generation
+EVALUATION_CHUNK_BYTES = 16 << 20  # Bound on the pizza masks gathered at once by Encoding.evaluate
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        return np.bitwise_count(words)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        return _BYTE_POPCOUNT[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1)
+
+
+class Encoding:
+    """
+    Array view of an instance for the vectorized genetic algorithm.
+
+    An individual is a row of length num_pizzas holding, for each pizza, the
+    delivery slot it is in or -1 if it is unused. Slots are fixed: the first
+    team_sizes[0] slots take 2 pizzas, the next team_sizes[1] take 3 and the
+    last team_sizes[2] take 4, so a row can never use more teams than exist.
+    """
+    def __init__(self, pizzas, team_sizes):
+        self.pizzas = list(pizzas)
+        self.column = {pizza.index: k for k, pizza in enumerate(self.pizzas)}
+        words = max(1, (max((pizza.mask.bit_length() for pizza in self.pizzas), default=0) + 63) // 64)
+        data = b"".join(pizza.mask.to_bytes(8 * words, "little") for pizza in self.pizzas)
+        self.masks = np.frombuffer(data, dtype="<u8").reshape(len(self.pizzas), words)
+        self.team_sizes = list(team_sizes)
+        self.slot_size = np.repeat(np.array([2, 3, 4]), self.team_sizes)
+        self.num_slots = len(self.slot_size)
+
+    def encode(self, solution):
+        row = np.full(len(self.pizzas), -1, dtype=np.int32)
+        next_slot = [0, self.team_sizes[0], self.team_sizes[0] + self.team_sizes[1]]
+        for delivery in solution.solution:
+            slot = next_slot[delivery.team_size - 2]
+            next_slot[delivery.team_size - 2] += 1
+            for pizza in delivery.pizzas:
+                row[self.column[pizza.index]] = slot
+        return row
+
+    def decode(self, row):
+        order = np.argsort(row, kind="stable")
+        sorted_slots = row[order]
+        first_used = np.searchsorted(sorted_slots, 0)
+        unused = [self.pizzas[k] for k in order[:first_used]]
+        deliveries = []
+        free = list(self.team_sizes)
+        boundaries = np.flatnonzero(np.diff(sorted_slots[first_used:])) + 1
+        for group in np.split(order[first_used:], boundaries):
+            if len(group) == 0:
+                continue
+            team_size = len(group)
+            deliveries.append(Delivery(team_size, [self.pizzas[k] for k in group]))
+            free[team_size - 2] -= 1
+        return Solution(deliveries, unused, free[0], free[1], free[2])
+
+    def evaluate(self, population):
+        """
+        Scores every row of population with one sort and one OR-reduction over the
+        deliveries of each chunk of rows. Chunks are sized so that the gathered masks take
+        at most EVALUATION_CHUNK_BYTES (or a single row), whatever the population size.
+        """
+        num_rows = population.shape[0]
+        row_bytes = max(1, population.shape[1] * self.masks.shape[1] * self.masks.itemsize)
+        chunk = max(1, EVALUATION_CHUNK_BYTES // row_bytes)
+        fitness = np.zeros(num_rows, dtype=np.int64)
+        for start in range(0, num_rows, chunk):
+            fitness[start:start + chunk] = self._evaluate_rows(population[start:start + chunk])
+        return fitness
+
+    def _evaluate_rows(self, population):
+        num_rows = population.shape[0]
+        rows, columns = np.nonzero(population >= 0)
+        fitness = np.zeros(num_rows, dtype=np.int64)
+        if len(rows) == 0:
+            return fitness
+        keys = rows.astype(np.int64) * self.num_slots + population[rows, columns]
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        union = np.bitwise_or.reduceat(self.masks[columns[order]], starts, axis=0)
+        distinct = popcount(union).sum(axis=1, dtype=np.int64)
+        np.add.at(fitness, keys[starts] // self.num_slots, distinct ** 2)
+        return fitness
+
+
+def select_parents(fitness, parent_selection, count, rng, tournament_size=TOURNAMENT_SIZE):
+    """
+    Draws count pairs of parent rows. Roulette uses stochastic universal sampling:
+    all 2 * count parents come from one spin with evenly spaced pointers and are then
+    paired at random.
+
+    Parameters:
+        fitness (numpy.ndarray): Fitness of each individual
+        parent_selection (str): "Tournament" or "Roulette"
+        count (int): Number of pairs
+        rng (numpy.random.Generator): Random generator
+        tournament_size (int): Individuals drawn per tournament
+
+    Returns:
+        parents (numpy.ndarray): Array of shape (count, 2) with row indices
+    """
+    size = len(fitness)
+    if count == 0:
+        return np.empty((0, 2), dtype=np.int64)  # The elite fills the whole population
+    if parent_selection == "Tournament":
+        entrants = rng.integers(0, size, size=(count, 2, tournament_size))
+        winners = np.argmax(fitness[entrants], axis=2)
+        return np.take_along_axis(entrants, winners[..., None], axis=2)[..., 0]
+    cumulative = np.cumsum(fitness, dtype=np.float64)
+    if cumulative[-1] <= 0:
+        return rng.integers(0, size, size=(count, 2))
+    step = cumulative[-1] / (2 * count)
+    pointers = (rng.random() + np.arange(2 * count)) * step
+    selected = np.minimum(np.searchsorted(cumulative, pointers, side="right"), size - 1)
+    return rng.permutation(selected).reshape(count, 2)
+
+
+def _take_slots(child, parent_rows, take):
+    """
+    Copies into child the slots of parent_rows selected by take, skipping any slot
+    that would reuse a pizza already placed in child. take has one extra last column,
+    always False, which unused pizzas (slot -1) index into.
+    """
+    rows = np.arange(child.shape[0])[:, None]
+    candidate = np.where(take[rows, parent_rows], parent_rows, -1)
+    clash_rows, clash_columns = np.nonzero((candidate >= 0) & (child >= 0))
+    blocked = np.zeros(take.shape, dtype=bool)
+    blocked[clash_rows, candidate[clash_rows, clash_columns]] = True
+    accepted = (candidate >= 0) & ~blocked[rows, candidate]
+    return np.where(accepted, candidate, child), blocked
+
+
+def crossover(population, parents, encoding, rng):
+    """
+    Slot-preserving uniform crossover: each slot of a child is taken whole from one of its
+    two parents. A slot whose pizzas are already used falls back to the other parent's version
+    of the slot, and stays empty if that clashes too.
+
+    Parameters:
+        population (numpy.ndarray): Current population
+        parents (numpy.ndarray): Array of shape (children, 2) with parent rows
+        encoding (Encoding): Encoding of the instance
+        rng (numpy.random.Generator): Random generator
+
+    Returns:
+        children (numpy.ndarray): Array of shape (children, num_pizzas)
+    """
+    first = population[parents[:, 0]]
+    second = population[parents[:, 1]]
+    from_first = rng.random((len(parents), encoding.num_slots + 1)) < 0.5
+    from_second = ~from_first
+    from_first[:, -1] = False
+    from_second[:, -1] = False
+
+    children, _ = _take_slots(np.full_like(first, -1), first, from_first)
+    children, blocked = _take_slots(children, second, from_second)
+    children, _ = _take_slots(children, first, blocked)
+    return children
+
+
+def mutate(children, encoding, rng):
+    """
+    Mutates each child with probability MUTATION_PROB. Most mutations swap the slots of two
+    random pizzas, which keeps every slot size; the others fill an empty slot with unused
+    pizzas or empty a used slot, like new_pizzas and remove_team.
+
+    Parameters:
+        children (numpy.ndarray): Children, mutated in place
+        encoding (Encoding): Encoding of the instance
+        rng (numpy.random.Generator): Random generator
+    """
+    count, num_pizzas = children.shape
+    mutated = np.flatnonzero(rng.random(count) < MUTATION_PROB)
+    operators = rng.integers(0, 4, size=len(mutated))
+
+    swapped = mutated[operators < 2]
+    first = rng.integers(0, num_pizzas, size=len(swapped))
+    second = rng.integers(0, num_pizzas, size=len(swapped))
+    first_slots = children[swapped, first]
+    children[swapped, first] = children[swapped, second]
+    children[swapped, second] = first_slots
+
+    for row, operator in zip(mutated[operators >= 2], operators[operators >= 2]):
+        child = children[row]
+        used = np.bincount(child[child >= 0], minlength=encoding.num_slots) > 0
+        if operator == 2:
+            unused = np.flatnonzero(child < 0)
+            empty = np.flatnonzero(~used & (encoding.slot_size <= len(unused)))
+            if len(empty) > 0:
+                slot = rng.choice(empty)
+                child[rng.choice(unused, size=encoding.slot_size[slot], replace=False)] = slot
+        elif used.any():
+            child[child == rng.choice(np.flatnonzero(used))] = -1
+
+
+def genetic_algorithm(pizzas, team_sizes, iterations, parent_selection, population_size=60, initializer="Random", plot=False,
+                      tournament_size=TOURNAMENT_SIZE, control=None, checkpoint=None, profiler=None,
+                      output=None):
+    """
+    Performs a vectorized Genetic Algorithm: the population is a 2-D integer array mapping each
+    pizza to a delivery slot, and selection, crossover, mutation and evaluation run as array
+    operations over the whole population, one generation per iteration.
+
+    Parameters:
+        pizzas (list): List of pizzas
+        team_sizes (list): List of team sizes
+        iterations (int): Number of generations, or None to run until control stops the search
+        parent_selection (str): Strategy for parent selection ("Tournament" or "Roulette")
+        population_size (int): Size of the population (default is 60)
+        initializer (str): Constructor of the initial solution ("Random" or "Greedy")
+        plot (bool): If True, shows the performance graph when the search ends
+        tournament_size (int): Individuals drawn per tournament when parent_selection is "Tournament"
+        control (SearchControl): Deadline, cancellation and best-so-far callback of the run
+        checkpoint (Checkpoint): Periodic checkpoints of the population array, restored if the run is resumed
+        profiler (Profiler): Collects operator counters and phase timings of the run
+        output (str): Path of the solution file, written atomically when the search ends, or None
+
+    Returns:
+        final_solution (object): Best solution found
+        final_score (float): Score of the best solution
+        report (dict): Run report of the profiler, returned only if profiler is given
+    """
+    control = control or SearchControl()
+    if profiler:
+        profiler.begin("init")
+    encoding = Encoding(pizzas, team_sizes)
+    state = checkpoint.restore("genetic_numpy") if checkpoint else None
+    if state is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+        population = np.stack([encoding.encode(utils.initial_solution(encoding.pizzas, team_sizes, initializer))
+                               for _ in range(population_size)])
+        start = 0
+    else:
+        random.setstate(state["random"])
+        rng = np.random.default_rng()
+        rng.bit_generator.state = state["rng"]
+        population = state["population"]
+        start = state["iteration"]
+    fitness = encoding.evaluate(population)
+    best_scores = []
+    avg_scores = []
+
+    if profiler:
+        profiler.begin("search")
+    for i in range(start, iterations) if iterations is not None else count(start):
+        if control.should_stop():
+            break
+        if plot:
+            avg_scores.append(float(fitness.mean()))
+            best_scores.append(int(fitness.max()))
+
+        parents = select_parents(fitness, parent_selection, population_size - ELITISM, rng, tournament_size)
+        children = crossover(population, parents, encoding, rng)
+        mutate(children, encoding, rng)
+
+        elite = np.argsort(fitness)[population_size - ELITISM:]
+        population = np.concatenate([population[elite], children])
+        fitness = np.concatenate([fitness[elite], encoding.evaluate(children)])
+        if control.due(int(fitness.max())):
+            best_index = int(np.argmax(fitness))
+            control.report(encoding.decode(population[best_index]), int(fitness[best_index]))
+        if checkpoint and checkpoint.due():
+            checkpoint.save("genetic_numpy", {
+                "random": random.getstate(), "rng": rng.bit_generator.state,
+                "iteration": i + 1, "population": population})
+
+    if profiler:
+        profiler.end()
+    best_index = int(np.argmax(fitness))
+    best_solution = encoding.decode(population[best_index])
+    best_score = int(fitness[best_index])
+    print(best_score)
+    if output:
+        utils.write_solution(best_solution, output, profiler)
+
+    if plot:
+        from genetic import show_graph
+        show_graph(best_scores, avg_scores)
+
+    if profiler:
+        return best_solution, best_score, profiler.report()
+    return best_solution, best_score
@@ -1,114 +1,258 @@
+import random
 import utils  
-import copy  
-import matplotlib.pyplot as plt  
+from control import SearchControl
+from models import popcount
 
-def get_candidate_solution(neighbourhood):
+ALPHA = 0.3  # Weight of the penalties relative to the score per feature at the first local optimum
+
+# Features are pairs of pizzas delivered to the same team, keyed by (smaller index, larger index).
+# The cost of a feature is the number of ingredients the two pizzas share: shared ingredients
+# are wasted, since a team scores each distinct ingredient once.
+
+def pair_key(first, second):
+    return (first.index, second.index) if first.index < second.index else (second.index, first.index)
+
+def feature_cost(first, second):
+    return popcount(first.mask & second.mask)
+
+def team_penalty(pizzas, penalties):
+    """
+    Returns the sum of the penalties of the pizza pairs of a team.
+    """
+    total = 0
+    for x in range(len(pizzas)):
+        for y in range(x + 1, len(pizzas)):
+            total += penalties.get(pair_key(pizzas[x], pizzas[y]), 0)
+    return total
+
+def _exchange_penalty(pizzas, position, pizza, penalties):
+    """
+    Returns the penalty change of putting pizza at position in a team.
+    """
+    old_pizza = pizzas[position]
+    total = 0
+    for k, other in enumerate(pizzas):
+        if k != position:
+            total += penalties.get(pair_key(pizza, other), 0) - penalties.get(pair_key(old_pizza, other), 0)
+    return total
+
+def penalty_delta(solution, move, penalties):
     """
-    Returns the best candidate solution and its score from a given neighbourhood.
+    Calculates the change of the penalty of a solution if a move is applied.
+    Only the teams the move touches are visited, so this is O(1) like the score delta.
     
     Parameters:
-        neighbourhood (list): List of neighbouring solutions
+        solution (object): Current solution
+        move (Move): Proposed move
+        penalties (dict): Penalty of each feature
         
     Returns:
-        new_solution (object): Best candidate solution
-        new_solution_score (float): Score of the best candidate solution
+        delta (int): Penalty change
     """
-    new_solution = None
-    new_solution_score = 0
-
-    for neighbour in neighbourhood:
-        neighbour_score = utils.evaluation_function(neighbour)
+    if not penalties:
+        return 0
+    if move.operator == "new_pizzas":
+        return team_penalty(move.args[0].pizzas, penalties)
+    if move.operator == "remove_team":
+        return -team_penalty(solution.solution[move.args[0]].pizzas, penalties)
+    if move.operator == "swap_1_unused":
+        i, n1, n2 = move.args
+        return _exchange_penalty(solution.solution[i].pizzas, n1, solution.unused_pizzas[n2], penalties)
+    i, n1, j, n2 = move.args
+    if i == j:
+        return 0
+    first_team = solution.solution[i].pizzas
+    second_team = solution.solution[j].pizzas
+    return (_exchange_penalty(first_team, n1, second_team[n2], penalties)
+            + _exchange_penalty(second_team, n2, first_team[n1], penalties))
 
-        if neighbour_score > new_solution_score:
-            new_solution = neighbour
-            new_solution_score = neighbour_score
+def raise_penalties(solution, penalties):
+    """
+    Penalises the features of a local optimum with the highest utility, cost / (1 + penalty).
+    
+    Parameters:
+        solution (object): Current solution, a local optimum
+        penalties (dict): Penalty of each feature, updated in place
+        
+    Returns:
+        raised (int): Number of penalised features, which is also the increase of the penalty of the solution
+        num_features (int): Number of features of the solution
+    """
+    best_utility = 0
+    features = []
+    num_features = 0
+    for delivery in solution.solution:
+        pizzas = delivery.pizzas
+        for x in range(len(pizzas)):
+            for y in range(x + 1, len(pizzas)):
+                num_features += 1
+                key = pair_key(pizzas[x], pizzas[y])
+                utility = feature_cost(pizzas[x], pizzas[y]) / (1 + penalties.get(key, 0))
+                if utility > best_utility:
+                    best_utility = utility
+                    features = [key]
+                elif utility == best_utility and utility > 0:
+                    features.append(key)
 
-    return new_solution, new_solution_score
+    for key in features:
+        penalties[key] = penalties.get(key, 0) + 1
+    return len(features), num_features
 
-def penalty_function(solution, best_solution_so_far):
+def get_candidate_move(solution, neighbourhood, penalties, penalty_weight):
     """
-    Calculates the penalty for a given solution compared to the best solution so far.
+    Returns the move with the largest augmented delta from a given neighbourhood:
+    its score delta minus penalty_weight times its penalty delta.
     
     Parameters:
         solution (object): Current solution
-        best_solution_so_far (object): Best solution found so far
+        neighbourhood (iterable): Candidate moves
+        penalties (dict): Penalty of each feature
+        penalty_weight (float): Weight of the penalties in the augmented score
         
     Returns:
-        penalty (int): Penalty for the current solution
+        new_move (Move): Best candidate move, or None if the neighbourhood is empty
+        new_augmented_delta (float): Augmented delta of the move
+        new_penalty_delta (int): Penalty delta of the move
     """
-    penalty = 0
+    new_move = None
+    new_augmented_delta = 0
+    new_penalty_delta = 0
 
-    for i in range(min(len(solution.solution), len(best_solution_so_far.solution))):
-        current_delivery = solution.solution[i]
-        best_delivery = best_solution_so_far.solution[i]
+    for move in neighbourhood:
+        move_penalty_delta = penalty_delta(solution, move, penalties)
+        augmented_delta = move.delta - penalty_weight * move_penalty_delta
+        if new_move is None or augmented_delta > new_augmented_delta:
+            new_move = move
+            new_augmented_delta = augmented_delta
+            new_penalty_delta = move_penalty_delta
 
-        penalty += abs(current_delivery.team_size - best_delivery.team_size)
+    return new_move, new_augmented_delta, new_penalty_delta
 
-        current_ingredients = set()
-        best_ingredients = set()
-
-        for pizza in current_delivery.pizzas:
-            current_ingredients.update(pizza.ingredients)
-
-        for pizza in best_delivery.pizzas:
-            best_ingredients.update(pizza.ingredients)
-
-        penalty += len(current_ingredients.intersection(best_ingredients))
-
-    return penalty
-
-def guided_local_search(pizzas, team_sizes, iterations):
+def guided_local_search(pizzas, team_sizes, iterations, initializer="Random", plot=False,
+                        neighbourhood_size=utils.NEIGHBOURHOOD_SIZE, alpha=ALPHA, control=None,
+                        checkpoint=None, profiler=None, output=None):
     """
     Performs Guided Local Search algorithm for optimizing pizza delivery routes.
+    The local search maximises the augmented score, score - penalty_weight * penalty,
+    where penalty sums the penalties of the pizza pairs sharing a team. When no sampled
+    move improves the augmented score the solution is a local optimum and the pairs
+    with the highest utility are penalised. Both scores are kept up to date with move deltas.
     
     Parameters:
         pizzas (list): List of pizzas
         team_sizes (list): List of team sizes
-        iterations (int): Number of iterations
+        iterations (int): Number of iterations, or None to run until control stops the search
+        initializer (str): Constructor of the initial solution ("Random" or "Greedy")
+        plot (bool): If True, shows the performance graph, with the augmented score, when the search ends
+        neighbourhood_size (int): Number of candidate moves sampled per iteration
+        alpha (float): Penalty weight factor; penalty_weight is alpha times the score per feature
+            at the first local optimum with a positive score
+        control (SearchControl): Deadline, cancellation and best-so-far callback of the run
+        checkpoint (Checkpoint): Periodic checkpoints of the search state, restored if the run is resumed
+        profiler (Profiler): Collects operator counters and phase timings of the run
+        output (str): Path of the solution file, written atomically when the search ends, or None
         
     Returns:
         best_solution (object): Best solution found
         best_score (float): Score of the best solution
+        report (dict): Run report of the profiler, returned only if profiler is given
     """
-    curr_solution = utils.randomize_deliveries(pizzas, team_sizes)  # Initialize current solution
+    control = control or SearchControl()
+    if profiler:
+        profiler.begin("init")
+    state = checkpoint.restore("guided_local_search") if checkpoint else None
+    if state is None:
+        curr_solution = utils.initial_solution(pizzas, team_sizes, initializer)  # Initialize current solution
+        best_solution = curr_solution.copy()  # Initialize best solution
+        penalties = {}  # Penalty of each feature, missing features have penalty 0
+        curr_penalty = 0  # Sum of the penalties of the features of the current solution
+        penalty_weight = None  # Set at the first local optimum with a positive score
+        curr_iteration = 0
+    else:
+        random.setstate(state["random"])
+        curr_solution = utils.decode_solution(state["current"], pizzas)
+        best_solution = utils.decode_solution(state["best"], pizzas)
+        penalties = state["penalties"]
+        curr_penalty = state["penalty"]
+        penalty_weight = state["penalty_weight"]
+        curr_iteration = state["iteration"]
     curr_score = utils.evaluation_function(curr_solution)  # Evaluate current solution
-
-    best_solution = copy.deepcopy(curr_solution)  # Initialize best solution
-    best_score = curr_score  # Initialize best score
+    best_score = best_solution.score  # Initialize best score
 
     explored_nodes = []  # List to store scores of explored solutions
     best_nodes = []  # List to store scores of the best solutions found
+    augmented_nodes = []  # List to store augmented scores of explored solutions
 
-    curr_iteration = 0
+    if profiler:
+        profiler.begin("search")
+    while (iterations is None or curr_iteration < iterations) and not control.should_stop():
+        neighbourhood = utils.generate_neighbourhood(curr_solution, neighbourhood_size)  # Sample candidate moves
 
-    while curr_iteration < iterations:
-        neighbourhood = utils.generate_neighbourhood(curr_solution)  # Generate neighbourhood solutions
+        new_move, augmented_delta, move_penalty_delta = get_candidate_move(curr_solution, neighbourhood, penalties,
+                                                                           penalty_weight or 0)
 
-        new_solution, new_solution_score = get_candidate_solution(neighbourhood)  # Get best candidate solution
+        if new_move is not None and augmented_delta > 0:
+            # Apply only the chosen move; both scores follow its deltas
+            utils.apply_move(curr_solution, new_move)
+            curr_score += new_move.delta
+            curr_penalty += move_penalty_delta
+        else:
+            # Local optimum of the augmented score: penalise its most useful features
+            raised, num_features = raise_penalties(curr_solution, penalties)
+            curr_penalty += raised
+            if penalty_weight is None and curr_score > 0:
+                # A weight set from a score of 0 would stay 0 and never guide the search
+                penalty_weight = alpha * curr_score / max(1, num_features)
 
-        # Calculate scores with penalty function
-        new_solution_score_with_penalty = new_solution_score - penalty_function(new_solution, best_solution)
-        curr_score_with_penalty = curr_score - penalty_function(curr_solution, best_solution)
+        # Update best solution if current solution is better
+        if curr_score > best_score:
+            best_solution = curr_solution.copy()
+            best_score = curr_score
 
-        # Update current solution if a better candidate is found
-        if new_solution is not None and new_solution_score_with_penalty > curr_score_with_penalty:
-            curr_solution = new_solution
-            curr_score = new_solution_score
+        # Append scores to the lists of the graph
+        if plot:
+            explored_nodes.append(curr_score)
+            best_nodes.append(best_score)
+            augmented_nodes.append(curr_score - (penalty_weight or 0) * curr_penalty)
+        if control.due(best_score):
+            control.report(best_solution, best_score)
 
-            # Update best solution if current solution is better
-            if curr_score > best_score:
-                best_solution = copy.deepcopy(curr_solution)
-                best_score = curr_score
+        curr_iteration += 1
+        if checkpoint and checkpoint.due():
+            checkpoint.save("guided_local_search", {
+                "random": random.getstate(), "iteration": curr_iteration,
+                "current": utils.encode_solution(curr_solution), "best": utils.encode_solution(best_solution),
+                "penalties": penalties, "penalty": curr_penalty, "penalty_weight": penalty_weight})
 
-        # Append scores to lists
-        explored_nodes.append(curr_score)
-        best_nodes.append(best_score)
+    if profiler:
+        profiler.end()
 
-        curr_iteration += 1
+    if output:
+        utils.write_solution(best_solution, output, profiler)
 
     # Plot the evolution of the algorithm
+    if plot:
+        show_graph(explored_nodes, best_nodes, augmented_nodes)
+
+    if profiler:
+        return best_solution, best_score, profiler.report()
+    return best_solution, best_score
+
+def show_graph(explored_nodes, best_nodes, augmented_nodes):
+    """
+    Plots the evolution of the algorithm.
+    
+    Parameters:
+        explored_nodes (list): Score of the current solution at each iteration
+        best_nodes (list): Best score at each iteration
+        augmented_nodes (list): Augmented score of the current solution at each iteration,
+            the objective the local search actually maximises
+    """
+    import matplotlib.pyplot as plt
+
     plt.plot(range(1, len(explored_nodes) + 1), explored_nodes, label='Explored Nodes')
     plt.plot(range(1, len(best_nodes) + 1), best_nodes, label='Best Nodes')
+    plt.plot(range(1, len(augmented_nodes) + 1), augmented_nodes, label='Augmented Score')
 
     plt.xlabel('Iteration')
     plt.ylabel('Solution Score')
@@ -116,5 +260,3 @@ def guided_local_search(pizzas, team_sizes, iterations):
     plt.legend()
     plt.grid(True)
     plt.show()
-
-    return best_solution, best_score
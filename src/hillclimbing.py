@@ -1,46 +1,92 @@
+import random
 import utils  
-import copy  
-import matplotlib.pyplot as plt  
+from control import SearchControl
 
-def hill_climbing(pizzas, team_sizes, iterations, improving_iterations=False):
+def hill_climbing(pizzas, team_sizes, iterations, improving_iterations=False, initializer="Random", plot=False, control=None,
+                  checkpoint=None, profiler=None, scheduler=None, output=None):
     """
     Performs Hill Climbing algorithm for optimizing pizza delivery routes.
     
     Parameters:
         pizzas (list): List of pizzas
         team_sizes (list): List of team sizes
-        iterations (int): Number of iterations
+        iterations (int): Number of iterations, or None to run until control stops the search
         improving_iterations (bool): If True, resets iteration count when a better solution is found
+        initializer (str): Constructor of the initial solution ("Random" or "Greedy")
+        plot (bool): If True, shows the performance graph when the search ends
+        control (SearchControl): Deadline, cancellation and best-so-far callback of the run
+        checkpoint (Checkpoint): Periodic checkpoints of the search state, restored if the run is resumed
+        profiler (Profiler): Collects operator counters and phase timings of the run
+        scheduler (OperatorScheduler): Adaptive choice of the neighbour operators; they are drawn uniformly if None
+        output (str): Path of the solution file, written atomically when the search ends, or None
         
     Returns:
         final_solution (object): Best solution found
         final_score (float): Score of the best solution
+        report (dict): Run report of the profiler, returned only if profiler is given
     """
-    total_iterations = 1
+    control = control or SearchControl()
+    if profiler:
+        profiler.begin("init")
     scores = []
-    curr_solution = utils.randomize_deliveries(pizzas, team_sizes)  # Initialize current solution
+    state = checkpoint.restore("hill_climbing") if checkpoint else None
+    if state is None:
+        curr_solution = utils.initial_solution(pizzas, team_sizes, initializer)  # Initialize current solution
+        curr_iteration = 0
+    else:
+        random.setstate(state["random"])
+        curr_solution = utils.decode_solution(state["current"], pizzas)
+        curr_iteration = state["iteration"]
+        if scheduler and state["scheduler"]:
+            scheduler.setstate(state["scheduler"])
     curr_score = utils.evaluation_function(curr_solution)  # Evaluate current solution
-
-    curr_iteration = 0
     
-    while curr_iteration < iterations:
-        total_iterations += 1
+    propose = scheduler.random_move if scheduler else utils.random_move
+    if profiler:
+        profiler.begin("search")
+    while (iterations is None or curr_iteration < iterations) and not control.should_stop():
         curr_iteration += 1
-        neighbour, neighbour_score  = utils.generate_neighbour_random(copy.deepcopy(curr_solution), curr_score)
-        if neighbour_score > curr_score: 
-            scores.append(neighbour_score)
-            curr_solution = neighbour
-            curr_score = neighbour_score
+        move = propose(curr_solution)
+        if move is not None and move.delta > 0:
+            utils.apply_move(curr_solution, move)
+            curr_score = curr_solution.score
             if improving_iterations == True:
                 curr_iteration = 0
-        else:
+        if plot:
             scores.append(curr_score)
+        if control.due(curr_score):
+            control.report(curr_solution, curr_score)
+        if checkpoint and checkpoint.due():
+            checkpoint.save("hill_climbing", {"random": random.getstate(), "iteration": curr_iteration,
+                                              "current": utils.encode_solution(curr_solution),
+                                              "scheduler": scheduler.getstate() if scheduler else None})
                 
+    if profiler:
+        profiler.end()
+
+    if output:
+        utils.write_solution(curr_solution, output, profiler)
+
     # Plot the performance
-    plt.plot(range(1, total_iterations), scores)
+    if plot:
+        show_graph(scores)
+    print(curr_score)
+    if profiler:
+        return curr_solution, curr_score, profiler.report()
+    return curr_solution, curr_score
+
+
+def show_graph(scores):
+    """
+    Plots the performance graph.
+    
+    Parameters:
+        scores (list): Score of the current solution at each iteration
+    """
+    import matplotlib.pyplot as plt
+
+    plt.plot(range(1, len(scores) + 1), scores)
     plt.xlabel('Iteration')
     plt.ylabel('Score')
     plt.title('Algorithm Performance')
     plt.show()
-    print(curr_score)
-    return curr_solution, curr_score
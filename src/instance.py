@@ -0,0 +1,150 @@
+import hashlib
+import mmap
+import os
+import struct
+from models import Catalog, Pizza
+
+CACHE_VERSION = 1
+CACHE_MAGIC = b"EMPZ"
+CACHE_DIR = ".cache"
+
+# magic, version, pizzas, ingredients, words per mask, total ingredient ids, names size, team sizes
+_HEADER = struct.Struct("<4sIQQQQQqqq")
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+class Instance:
+    """
+    Columnar (CSR) view of an input file.
+
+    The ingredients of pizza k are ingredient_ids[offsets[k]:offsets[k + 1]] and
+    its bitmask is row k of masks, words_per_mask little-endian uint64 words long.
+    """
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        (magic, version, num_pizzas, num_ingredients, words, num_ids, names_size,
+         team_2, team_3, team_4) = _HEADER.unpack_from(view, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            raise ValueError("Not an instance cache of the current version")
+
+        self.buffer = buffer
+        self.num_pizzas = num_pizzas
+        self.num_ingredients = num_ingredients
+        self.words_per_mask = words
+        self.team_sizes = [team_2, team_3, team_4]
+
+        start = _HEADER.size
+        end = start + 8 * (num_pizzas + 1)
+        self.offsets = view[start:end].cast("q")
+        start = _align(end)
+        end = start + 4 * num_ids
+        self.ingredient_ids = view[start:end].cast("i")
+        start = _align(end)
+        end = start + 8 * words * num_pizzas
+        self.masks = view[start:end]
+        start = end
+        self.ingredient_names = bytes(view[start:start + names_size]).decode().split("\n") if names_size else []
+
+    def build_pizzas(self):
+        """
+        Builds one Pizza per row, in file order. Pizzas are indexed from 1 like the original parser.
+        """
+        catalog = Catalog(self.ingredient_names)
+        masks = self.masks
+        row_size = 8 * self.words_per_mask
+        pizzas = []
+        for k in range(self.num_pizzas):
+            mask = int.from_bytes(masks[k * row_size:(k + 1) * row_size], "little")
+            pizzas.append(Pizza(k + 1, mask, catalog))
+        catalog.pizzas = tuple(pizzas)
+        return pizzas
+
+
+def tokenize_file(file_path):
+    """
+    Reads an input file and packs it into the binary layout read by Instance.
+
+    Parameters:
+        file_path (str): Path to the input file.
+
+    Returns:
+        data (bytes): Packed instance.
+    """
+    ingredient_ids = {}
+    offsets = [0]
+    ids = []
+    masks = []
+    with open(file_path, 'r') as file:
+        team_sizes = list(map(int, file.readline().split()))[1:]
+        for line in file:
+            pizza_data = line.split()
+            if not pizza_data:
+                continue
+            mask = 0
+            for ingredient in pizza_data[1:]:
+                ingredient_id = ingredient_ids.setdefault(ingredient, len(ingredient_ids))
+                ids.append(ingredient_id)
+                mask |= 1 << ingredient_id
+            offsets.append(len(ids))
+            masks.append(mask)
+
+    words = max(1, (len(ingredient_ids) + 63) // 64)
+    row_size = 8 * words
+    names = "\n".join(ingredient_ids).encode()
+    header = _HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(masks), len(ingredient_ids), words, len(ids),
+                          len(names), *team_sizes)
+    offsets_data = struct.pack(f"<{len(offsets)}q", *offsets)
+    ids_data = struct.pack(f"<{len(ids)}i", *ids)
+    parts = [header, offsets_data, bytes(_align(len(offsets_data)) - len(offsets_data)),
+             ids_data, bytes(_align(len(ids_data)) - len(ids_data)),
+             b"".join(mask.to_bytes(row_size, "little") for mask in masks), names]
+    return b"".join(parts)
+
+
+def cache_path(file_path):
+    """
+    Returns the sidecar cache path of an input file, keyed by the hash of its contents.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, CACHE_DIR, f"{name}.{digest.hexdigest()[:16]}.v{CACHE_VERSION}.bin")
+
+
+def load_instance(file_path, use_cache=True):
+    """
+    Loads an input file as an Instance.
+    The first load writes a binary sidecar next to the input; later loads memory-map it.
+
+    Parameters:
+        file_path (str): Path to the input file.
+        use_cache (bool): Whether to read and write the sidecar cache.
+
+    Returns:
+        instance (Instance): Columnar view of the file.
+    """
+    if not use_cache:
+        return Instance(tokenize_file(file_path))
+
+    path = cache_path(file_path)
+    try:
+        with open(path, 'rb') as file:
+            return Instance(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError, struct.error):
+        pass
+
+    data = tokenize_file(file_path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        pass  # A read-only data folder only costs the cache
+    return Instance(data)
@@ -0,0 +1,133 @@
+import queue
+import random
+import multiprocessing
+import time
+from itertools import count
+import utils
+from control import SearchControl
+from genetic import TOURNAMENT_SIZE, evolve, initialize_population
+from multistart import open_shared_instance, share_instance
+
+def receive_migrants(inbox, population, all_scores, pizzas):
+    """
+    Replaces the worst individuals of an island with the migrants waiting in its inbox.
+    Migrants already in the population are discarded.
+
+    Parameters:
+        inbox (Queue): Queue of encoded solutions sent by other islands
+        population (list): Population of the island, updated in place
+        all_scores (list): Score of each individual, updated in place
+        pizzas (list): Pizza objects in file order
+    """
+    while True:
+        try:
+            data = inbox.get_nowait()
+        except queue.Empty:
+            return
+        migrant = utils.decode_solution(data, pizzas)
+        if any(individual.fingerprint == migrant.fingerprint for individual in population):
+            continue
+        worst = min(range(len(population)), key=lambda i: all_scores[i])
+        if migrant.score > all_scores[worst]:
+            population[worst] = migrant
+            all_scores[worst] = migrant.score
+
+def run_island(island, shared_name, inboxes, results, seed, iterations, parent_selection, population_size,
+               migration_interval, migrants, topology, initializer, tournament_size, deadline=None):
+    """
+    Evolves one island and sends its best individuals to other islands every migration_interval generations.
+    Runs in its own process.
+    """
+    random.seed(seed)
+    # shared keeps the block mapped for the lifetime of the process
+    shared, pizzas, team_sizes = open_shared_instance(shared_name)
+    for inbox in inboxes:
+        # Let the island exit even if a neighbour finished before reading its last migrants
+        inbox.cancel_join_thread()
+
+    population = initialize_population(pizzas, team_sizes, population_size, initializer)
+    all_scores = [utils.evaluation_function(individual) for individual in population]
+    islands = len(inboxes)
+
+    control = SearchControl(deadline=deadline)
+    for generation in range(1, iterations + 1) if iterations is not None else count(1):
+        if control.should_stop():
+            break
+        evolve(population, all_scores, team_sizes, parent_selection, tournament_size)
+        if islands > 1 and generation % migration_interval == 0:
+            best = sorted(range(len(population)), key=lambda i: all_scores[i], reverse=True)[:migrants]
+            for i in best:
+                if topology == "ring":
+                    target = (island + 1) % islands
+                else:
+                    target = random.choice([other for other in range(islands) if other != island])
+                inboxes[target].put(utils.encode_solution(population[i]))
+            receive_migrants(inboxes[island], population, all_scores, pizzas)
+
+    best = max(range(len(population)), key=lambda i: all_scores[i])
+    results.put((all_scores[best], utils.encode_solution(population[best])))
+
+def island_genetic_algorithm(file_path, iterations, parent_selection, population_size=60, islands=4,
+                             migration_interval=10, migrants=2, topology="ring", initializer="Random", seed=None,
+                             tournament_size=TOURNAMENT_SIZE, time_budget=None, output=None):
+    """
+    Performs an island-model Genetic Algorithm: each island evolves its own population
+    in a separate process and islands exchange their best individuals periodically.
+    Migrants travel as utils.encode_solution bytes and the instance is shared between
+    the processes (see multistart.share_instance).
+    
+    Parameters:
+        file_path (str): Path to the input file
+        iterations (int): Number of generations of each island, or None to run until the time budget ends
+        parent_selection (str): Strategy for parent selection
+        population_size (int): Size of the population of each island (default is 60)
+        islands (int): Number of islands, one process each
+        migration_interval (int): Generations between migrations
+        migrants (int): Number of best individuals each island sends per migration
+        topology (str): "ring" sends to the next island, "random" to a random other island
+        initializer (str): Constructor of the initial solution ("Random" or "Greedy")
+        seed (int): Base seed; island k uses seed + k. Random seeds are drawn if None.
+        tournament_size (int): Individuals drawn per tournament when parent_selection is "Tournament"
+        time_budget (float): Seconds the islands may evolve; each island then returns its best individual
+        output (str): Path the best solution is written to atomically, or None
+        
+    Returns:
+        final_solution (object): Best solution found
+        final_score (float): Score of the best solution
+    """
+    if seed is None:
+        seeds = [random.getrandbits(32) for _ in range(islands)]
+    else:
+        seeds = [seed + k for k in range(islands)]
+
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    shared = share_instance(file_path)
+    try:
+        inboxes = [multiprocessing.Queue() for _ in range(islands)]
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=run_island, args=(k, shared.name, inboxes, results, seeds[k], iterations,
+                                                                      parent_selection, population_size, migration_interval,
+                                                                      migrants, topology, initializer, tournament_size,
+                                                                      deadline))
+                     for k in range(islands)]
+        for process in processes:
+            process.start()
+        island_results = []
+        while len(island_results) < islands:
+            try:
+                island_results.append(results.get(timeout=1))
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError("An island process exited without returning its result")
+        for process in processes:
+            process.join()
+    finally:
+        shared.close()
+        shared.unlink()
+
+    best_score, best_data = max(island_results, key=lambda result: result[0])
+    pizzas, _ = utils.parse_file(file_path)
+    best_solution = utils.decode_solution(best_data, pizzas)
+    if output:
+        utils.write_solution(best_solution, output)
+    return best_solution, best_score
@@ -1,6 +1,7 @@
 # Import necessary modules
 import sys
 import os
+import random
 from PyQt5.QtWidgets import QApplication, QMainWindow, QComboBox, QLabel, QPushButton, QVBoxLayout, QWidget, QLineEdit
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
@@ -11,6 +12,7 @@ from hillclimbing import hill_climbing
 from simulatedAnnealing import simulated_annealing
 from tabusearch import tabu_search
 from genetic import genetic_algorithm
+from geneticnumpy import genetic_algorithm as genetic_numpy_algorithm
 from guidedlocalsearch import guided_local_search
 import utils
 import time
@@ -46,7 +48,7 @@ class MainWindow(QMainWindow):
         folder_path = "data"  
         files = os.listdir(folder_path)
         for file_name in files:
-            if file_name.endswith(''):
+            if os.path.isfile(os.path.join(folder_path, file_name)):  # Skips the .cache folder of instance sidecars
                 self.file_combo.addItem(file_name)
         self.file_combo.move(200, 145)
         self.file_combo.resize(200, 40)
@@ -63,6 +65,7 @@ class MainWindow(QMainWindow):
         self.algorithm_combo.addItem("Simulated Annealing")
         self.algorithm_combo.addItem("Tabu search")
         self.algorithm_combo.addItem("Genetic algorithm")
+        self.algorithm_combo.addItem("Genetic algorithm (NumPy)")
         self.algorithm_combo.addItem("Guided Local Search")
         self.algorithm_combo.move(200, 200)
         self.algorithm_combo.resize(150, 40)
@@ -120,6 +123,14 @@ class MainWindow(QMainWindow):
         self.iterations_edit.move(100, 250)
         self.iterations_edit.resize(50, 30)
         
+        # Add widgets for choosing how the initial solution is built
+        self.initializer_label = QLabel("Initial solution:", self)
+        self.initializer_label.move(10, 350)
+        self.initializer_combo = QComboBox(self)
+        self.initializer_combo.addItem("Random")
+        self.initializer_combo.addItem("Greedy")
+        self.initializer_combo.move(120, 350)
+
         # Add a button to run the selected algorithm
         self.run_button = QPushButton("Run Algorithm", self)
         self.run_button.move(10, 400)
@@ -165,7 +176,7 @@ class MainWindow(QMainWindow):
             self.genetic_population.hide()
             self.genetic_type.hide()
             self.genetic_selection_label.hide()
-        elif algorithm == "Genetic algorithm":
+        elif algorithm in ("Genetic algorithm", "Genetic algorithm (NumPy)"):
             self.selection_iterations_label.hide()
             self.selection_iterations.hide()
             self.selection_cooling_label.hide()
@@ -215,18 +226,25 @@ class MainWindow(QMainWindow):
             iterations_type_bool = True
             if(iterations_type == "Total of iterations"):
                 iterations_type_bool = False               
+            initializer = self.initializer_combo.currentText()
+            # Seed the run so that its solution file, named after the seed, can be reproduced
+            seed = random.getrandbits(32)
+            random.seed(seed)
+            output = utils.output_path(self.file_path, algorithm, seed)
             # Execute the selected algorithm
             if algorithm == "Hill Climbing":
-                solution, score = hill_climbing(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), iterations_type_bool)
-                solution.save_to_file("solution_output.txt")
+                solution, score = hill_climbing(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), iterations_type_bool, initializer, plot=True, output=output)
             elif algorithm == "Simulated Annealing":
-                result, score = simulated_annealing(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), int(self.cooling_option.text()))
+                result, score = simulated_annealing(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), int(self.cooling_option.text()), initializer, plot=True, output=output)
             elif algorithm == "Tabu search":
-                result, score = tabu_search(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), int(self.tabu_tenure.text()))
+                result, score = tabu_search(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), int(self.tabu_tenure.text()), initializer, plot=True, output=output)
             elif algorithm == "Genetic algorithm":
-                result, score = genetic_algorithm(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), self.genetic_type.currentText(), int(self.genetic_population.text()))
+                result, score = genetic_algorithm(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), self.genetic_type.currentText(), int(self.genetic_population.text()), initializer, plot=True, output=output)
+            elif algorithm == "Genetic algorithm (NumPy)":
+                result, score = genetic_numpy_algorithm(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), self.genetic_type.currentText(), int(self.genetic_population.text()), initializer, plot=True, output=output)
             elif algorithm == "Guided Local Search":
-                result, score = guided_local_search(self.pizzas, self.team_sizes, int(self.iterations_edit.text()))
+                result, score = guided_local_search(self.pizzas, self.team_sizes, int(self.iterations_edit.text()), initializer, plot=True, output=output)
+            print("Solution written to", output)
             # Display the final score of the algorithm
             self.algorithm_score_value.setText(str(score))
             print(score)
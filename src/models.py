@@ -1,42 +1,331 @@
+import os
+import random
+from array import array
+from fileio import write_atomic
+
+MASK64 = (1 << 64) - 1
+OUTPUT_DIR = "output"  # Folder of the solution files written by save_to_file and utils.output_path
+
+
+def mix64(value):
+    """
+    SplitMix64 finalizer: maps an integer to a well-spread 64-bit key.
+    """
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count  # Python 3.10+
+else:
+    def popcount(mask):
+        """
+        Returns the number of set bits of mask, for Python versions without int.bit_count.
+        """
+        return bin(mask).count("1")
+
+
+class Catalog:
+    """
+    Tables shared by the pizzas of an instance: the pizzas by index - 1 and the
+    ingredient names by id. Pools of pizzas store indices and look the pizzas up here.
+    """
+    __slots__ = ("pizzas", "names")
+
+    def __init__(self, names, pizzas=()):
+        self.names = tuple(names)
+        self.pizzas = tuple(pizzas)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
 class Pizza:
-    def __init__(self , index, num_ingredient, ingredients):
-        self.index = index
-        self.num_ingredient = num_ingredient
-        self.ingredients = ingredients
-        
-    
+    """
+    Immutable pizza record. The ingredients are the bits of mask and their names are
+    looked up in the catalog, so a pizza holds no per-ingredient objects. Pizzas are
+    shared by every solution and never copied.
+    """
+    __slots__ = ("index", "mask", "key", "catalog")
+
+    def __init__(self, index, mask, catalog):
+        object.__setattr__(self, "index", index)
+        object.__setattr__(self, "mask", mask)  # Bit i is set when the pizza has the ingredient with id i
+        object.__setattr__(self, "key", mix64(index))  # Zobrist key of the pizza, used by the solution fingerprints
+        object.__setattr__(self, "catalog", catalog)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Pizza is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Pizza is immutable")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return Pizza, (self.index, self.mask, self.catalog)
+
+    @property
+    def num_ingredient(self):
+        return popcount(self.mask)
+
+    @property
+    def ingredient_ids(self):
+        ids = []
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            ids.append(low.bit_length() - 1)
+            mask ^= low
+        return tuple(ids)
+
+    @property
+    def ingredients(self):
+        return [self.catalog.names[ingredient_id] for ingredient_id in self.ingredient_ids]
+
     def __str__(self):
         return f"Index: {self.index}, Number of ingrediente: {self.num_ingredient}, Ingredients: {', '.join(self.ingredients)}"
 
-class Delivery:
-    def __init__(self, team_size, pizzas):
-        self.team_size = team_size
-        self.pizzas = pizzas
+class Delivery(tuple):
+    """
+    Immutable team of pizzas, stored as a tuple of the shared pizza records. Copies of
+    a solution share their deliveries, and a move puts a new delivery in place of the
+    one it changes.
+    """
+    __slots__ = ()
+
+    def __new__(cls, team_size, pizzas):
+        delivery = tuple.__new__(cls, pizzas)
+        if len(delivery) != team_size:
+            raise ValueError(f"A team of {team_size} needs {team_size} pizzas, not {len(delivery)}")
+        return delivery
+
+    def __reduce__(self):
+        return Delivery, (len(self), tuple(self))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @property
+    def team_size(self):
+        return len(self)
+
+    @property
+    def pizzas(self):
+        return self
+
+    @property
+    def score(self):
+        mask = 0
+        for pizza in self:
+            mask |= pizza.mask
+        return popcount(mask) ** 2
+
+    @property
+    def key(self):
+        """
+        XOR of the keys of the pizzas, independent of their order.
+        """
+        key = 0
+        for pizza in self:
+            key ^= pizza.key
+        return key
+
+    def replace_delta(self, position, pizza):
+        """
+        Score change of putting pizza at position.
+        """
+        if self[position] is pizza:
+            return 0
+        mask = pizza.mask
+        for k, other in enumerate(self):
+            if k != position:
+                mask |= other.mask
+        return popcount(mask) ** 2 - self.score
+
+    def replaced(self, position, pizza):
+        """
+        Returns the delivery with pizza at position.
+        """
+        return tuple.__new__(Delivery, self[:position] + (pizza,) + self[position + 1:])
+
+    def swapped(self, first, second):
+        """
+        Returns the delivery with the pizzas at two positions exchanged, which has the same score and key.
+        """
+        pizzas = list(self)
+        pizzas[first], pizzas[second] = pizzas[second], pizzas[first]
+        return tuple.__new__(Delivery, pizzas)
+
+    def copy(self):
+        return self
 
     def __str__(self):
-        pizzas_info = "\n".join(str(pizza) for pizza in self.pizzas)
+        pizzas_info = "\n".join(str(pizza) for pizza in self)
         return f"Delivery: Team size - {self.team_size}, Pizzas:\n{pizzas_info}"
     
 
 
-class Solution:    
+class PizzaPool:
+    """
+    Unordered set of pizzas with O(1) add, remove and random draws, stored as an array
+    of pizza indices and an array of their positions.
+    """
+    __slots__ = ("catalog", "indices", "positions")
+
+    def __init__(self, pizzas=()):
+        self.catalog = None  # Catalog of the first pizza added
+        self.indices = array("i")
+        self.positions = array("i")  # Pizza index -> position in self.indices, or -1 if absent
+        self.extend(pizzas)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        table = self.catalog.pizzas if self.catalog else ()
+        return (table[index - 1] for index in self.indices)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            table = self.catalog.pizzas
+            return [table[index - 1] for index in self.indices[position]]
+        return self.catalog.pizzas[self.indices[position] - 1]
+
+    def __contains__(self, pizza):
+        return pizza.index < len(self.positions) and self.positions[pizza.index] >= 0
+
+    def position(self, pizza):
+        position = self.positions[pizza.index] if pizza.index < len(self.positions) else -1
+        if position < 0:
+            raise KeyError(pizza.index)
+        return position
+
+    def _reserve(self, pizza):
+        if self.catalog is None:
+            self.catalog = pizza.catalog
+            self.positions = array("i", [-1]) * (len(self.catalog.pizzas) + 1)
+        elif pizza.index >= len(self.positions):
+            self.positions.extend(array("i", [-1]) * (pizza.index + 1 - len(self.positions)))
+
+    def add(self, pizza):
+        self._reserve(pizza)
+        self.positions[pizza.index] = len(self.indices)
+        self.indices.append(pizza.index)
+
+    def extend(self, pizzas):
+        for pizza in pizzas:
+            self.add(pizza)
+
+    def remove(self, pizza):
+        """
+        Removes a pizza by moving the last pizza of the pool into its position.
+        """
+        position = self.position(pizza)
+        self.positions[pizza.index] = -1
+        last = self.indices.pop()
+        if last != pizza.index:
+            self.indices[position] = last
+            self.positions[last] = position
+
+    def replace(self, position, pizza):
+        """
+        Puts pizza at position and returns the pizza that was there.
+        """
+        old_pizza = self[position]
+        self.positions[old_pizza.index] = -1
+        self._reserve(pizza)
+        self.indices[position] = pizza.index
+        self.positions[pizza.index] = position
+        return old_pizza
+
+    def choice(self):
+        return self[random.randrange(len(self.indices))]
+
+    def sample(self, k):
+        """
+        Draws k distinct pizzas without removing them from the pool.
+        """
+        return [self[position] for position in random.sample(range(len(self.indices)), k)]
+
+    def copy(self):
+        pool = PizzaPool.__new__(PizzaPool)
+        pool.catalog = self.catalog
+        pool.indices = self.indices[:]
+        pool.positions = self.positions[:]
+        return pool
+
+
+class Solution:
+    __slots__ = ("solution", "unused_pizzas", "free", "score", "fingerprint")
+
     def __init__(self, solution, unused_pizzas, free_of_2, free_of_3, free_of_4):
         self.solution = solution
-        self.unused_pizzas = unused_pizzas
+        self.unused_pizzas = unused_pizzas if isinstance(unused_pizzas, PizzaPool) else PizzaPool(unused_pizzas)
         self.free = [free_of_2, free_of_3, free_of_4]
+        self.score = sum(delivery.score for delivery in solution)  # Running total kept up to date by the move operators
+        # XOR of mix64(delivery.key) over the deliveries: equal for solutions with the same teams,
+        # whatever their order, and kept up to date by the move operators like the score
+        self.fingerprint = 0
+        for delivery in solution:
+            self.fingerprint ^= mix64(delivery.key)
     
+    def copy(self):
+        """
+        Returns an independent copy of the solution. Pizzas and deliveries are shared, since they never change.
+        """
+        solution = Solution.__new__(Solution)
+        solution.solution = list(self.solution)
+        solution.unused_pizzas = self.unused_pizzas.copy()
+        solution.free = list(self.free)
+        solution.score = self.score
+        solution.fingerprint = self.fingerprint
+        return solution
+
     def __str__(self):
         delivery_info = "\n".join(str(delivery) for delivery in self.solution)
         pizza_info = "\n".join(str(pizza) for pizza in self.unused_pizzas)
         return f"Deliveries: \n{delivery_info} \nUnused pizzas: \n{pizza_info} \nFree teams: \n{self.free}"
     
     def save_to_file(self, filename):
-        output_path = f"output/{filename}"
-        with open(output_path, "w") as file:
-            file.write(str(len(self.solution)))
-            for delivery in self.solution:
-                file.write("\n" + str(delivery.team_size))
-                for pizza in delivery.pizzas:
-                    file.write(" " + str(pizza.index))
-
-          
+        self.write(os.path.join(OUTPUT_DIR, filename))
+
+    def output_text(self):
+        """
+        Returns the solution in the output file format, built in a single join.
+        """
+        lines = [str(len(self.solution))]
+        lines.extend(" ".join([str(len(delivery))] + [str(pizza.index) for pizza in delivery]) for delivery in self.solution)
+        return "\n".join(lines)
+
+    def write(self, output_path):
+        """
+        Writes the solution to output_path. The file is replaced atomically, so it never
+        holds a partial solution.
+        """
+        write_atomic(output_path, self.output_text().encode())
+
+
+class Move:
+    __slots__ = ("operator", "args", "delta", "undo")
+
+    def __init__(self, operator, args, delta):
+        self.operator = operator  # Name of the neighbour operator that proposed the move
+        self.args = args
+        self.delta = delta  # Score change of applying the move
+        self.undo = None  # Filled by apply_move with what revert_move needs
+
+    def __str__(self):
+        return f"Move: {self.operator} {self.args}, Delta: {self.delta}"
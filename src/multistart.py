@@ -0,0 +1,122 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import utils
+from control import SearchControl
+from instance import Instance, load_instance
+from solvers import load_algorithm
+
+# Per-worker state, set by attach_instance when the worker process starts
+_shared = None
+_pizzas = None
+_team_sizes = None
+
+def share_instance(file_path):
+    """
+    Copies the packed instance of a file into a new shared memory block.
+
+    Parameters:
+        file_path (str): Path to the input file.
+
+    Returns:
+        shared (SharedMemory): Block holding the instance. The caller must close and unlink it.
+    """
+    buffer = load_instance(file_path).buffer
+    shared = shared_memory.SharedMemory(create=True, size=len(buffer))
+    shared.buf[:len(buffer)] = buffer
+    return shared
+
+def open_shared_instance(name):
+    """
+    Maps a shared instance created by share_instance and builds the pizzas from it.
+    Only the packed instance is shared: the Pizza objects the algorithms work on are
+    private to each process, about 17 MiB on d_many_pizzas.in against a 4 MiB block,
+    since Python objects cannot live in shared memory. What sharing saves is parsing
+    the file and pickling the pizzas once per worker.
+
+    Parameters:
+        name (str): Name of the shared memory block.
+
+    Returns:
+        shared (SharedMemory): Mapped block. It must stay referenced while the instance is used.
+        pizzas (list): Pizza objects in file order.
+        team_sizes (list): List of team sizes.
+    """
+    shared = shared_memory.SharedMemory(name=name)
+    instance = Instance(shared.buf)
+    return shared, instance.build_pizzas(), list(instance.team_sizes)
+
+def attach_instance(name):
+    """
+    Worker initializer: maps the shared instance for run_restart.
+
+    Parameters:
+        name (str): Name of the shared memory block.
+    """
+    global _shared, _pizzas, _team_sizes
+    _shared, _pizzas, _team_sizes = open_shared_instance(name)
+
+def run_restart(algorithm_name, seed, parameters, deadline=None):
+    """
+    Runs one restart inside a worker.
+
+    Parameters:
+        algorithm_name (str): Key of solvers.ALGORITHMS.
+        seed (int): Seed of this restart.
+        parameters (dict): Keyword arguments of the algorithm.
+        deadline (float): time.monotonic() value at which the restart stops, shared by all restarts.
+
+    Returns:
+        score (int): Score of the solution found.
+        data (bytes): Solution packed with utils.encode_solution.
+    """
+    random.seed(seed)
+    if deadline is not None:
+        parameters = dict(parameters, control=SearchControl(deadline=deadline))
+    solution, score = load_algorithm(algorithm_name)(_pizzas, _team_sizes, **parameters)
+    return score, utils.encode_solution(solution)
+
+def multi_start(file_path, algorithm_name, restarts, workers=None, seed=None, time_budget=None, output=None, **parameters):
+    """
+    Runs independent restarts of an algorithm in a process pool and keeps the best solution.
+    The packed instance is placed once in shared memory and every worker maps it instead
+    of receiving its own pickled copy, then builds its own pizzas from it (see
+    open_shared_instance), so each worker still holds one copy of the Pizza objects.
+
+    Parameters:
+        file_path (str): Path to the input file.
+        algorithm_name (str): Key of solvers.ALGORITHMS.
+        restarts (int): Number of independent runs.
+        workers (int): Number of worker processes (default: one per CPU).
+        seed (int): Base seed; restart k uses seed + k. Random seeds are drawn if None.
+        time_budget (float): Seconds all restarts together may run; restarts still running
+            at the end of the budget return their best-so-far solution.
+        output (str): Path the best solution is written to atomically, or None.
+        parameters: Keyword arguments of the algorithm.
+
+    Returns:
+        best_solution (Solution): Best solution over all restarts.
+        best_score (int): Score of the best solution.
+    """
+    if seed is None:
+        seeds = [random.getrandbits(32) for _ in range(restarts)]
+    else:
+        seeds = [seed + k for k in range(restarts)]
+
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    shared = share_instance(file_path)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_instance, initargs=(shared.name,)) as executor:
+            results = list(executor.map(run_restart, [algorithm_name] * restarts, seeds, [parameters] * restarts,
+                                        [deadline] * restarts))
+    finally:
+        shared.close()
+        shared.unlink()
+
+    best_score, best_data = max(results, key=lambda result: result[0])
+    pizzas, _ = utils.parse_file(file_path)
+    best_solution = utils.decode_solution(best_data, pizzas)
+    if output:
+        utils.write_solution(best_solution, output)
+    return best_solution, best_score
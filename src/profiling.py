@@ -0,0 +1,107 @@
+import time
+import utils
+
+
+class OperatorStats:
+    """
+    Counters of one neighbour operator.
+    """
+    def __init__(self):
+        self.calls = 0  # Moves proposed, including proposals that found no valid move
+        self.empty = 0  # Proposals that found no valid move
+        self.accepts = 0  # Proposed moves applied to the solution
+        self.improvements = 0  # Applied moves with a positive delta
+        self.delta = 0  # Sum of the deltas of the applied moves
+        self.time = 0.0  # Seconds spent proposing and evaluating moves
+
+
+class Profiler:
+    """
+    Per-operator counters and phase timings of a run.
+
+    Phases are opened with begin and closed by the next begin or by end, and their times
+    add up by name: the callers time "parse" and "write" around an algorithm, which times
+    its own "init" and "search". While a phase is open the proposers in utils.PROPOSERS
+    are wrapped to count and time every proposal, and utils.apply_move reports each applied
+    move. A run without a profiler therefore pays nothing per proposal and a single None
+    check per applied move.
+    """
+    def __init__(self):
+        self.operators = {}  # Operator name -> OperatorStats
+        self.phases = {}  # Phase name -> seconds
+        self.phase = None  # Name of the open phase
+        self.phase_start = None
+        self.proposers = None  # Unwrapped proposers while the hooks are installed
+
+    def begin(self, phase):
+        """
+        Closes the open phase, if any, and opens phase.
+        """
+        now = time.perf_counter()
+        if self.phase is not None:
+            self.phases[self.phase] = self.phases.get(self.phase, 0.0) + now - self.phase_start
+        else:
+            self.install()
+        self.phase = phase
+        self.phase_start = now
+
+    def end(self):
+        """
+        Closes the open phase and removes the operator hooks.
+        """
+        if self.phase is None:
+            return
+        self.phases[self.phase] = self.phases.get(self.phase, 0.0) + time.perf_counter() - self.phase_start
+        self.phase = None
+        self.uninstall()
+
+    def install(self):
+        self.proposers = list(utils.PROPOSERS)
+        utils.PROPOSERS[:] = [self.timed(proposer) for proposer in self.proposers]
+        utils.move_observer = self.accepted
+
+    def uninstall(self):
+        utils.PROPOSERS[:] = self.proposers
+        utils.move_observer = None
+        self.proposers = None
+
+    def stats(self, operator):
+        if operator not in self.operators:
+            self.operators[operator] = OperatorStats()
+        return self.operators[operator]
+
+    def timed(self, proposer):
+        """
+        Wraps a proposer of utils.PROPOSERS to count and time its proposals.
+        """
+        stats = self.stats(proposer.__name__.replace("propose_", "", 1))
+
+        def timed_proposer(solution):
+            start = time.perf_counter()
+            move = proposer(solution)
+            stats.time += time.perf_counter() - start
+            stats.calls += 1
+            if move is None:
+                stats.empty += 1
+            return move
+        return timed_proposer
+
+    def accepted(self, move):
+        stats = self.stats(move.operator)
+        stats.accepts += 1
+        stats.delta += move.delta
+        if move.delta > 0:
+            stats.improvements += 1
+
+    def report(self):
+        """
+        Returns the run report.
+
+        Returns:
+            report (dict): "phases" maps each phase to its seconds and "operators" maps each
+                operator to its counters (calls, empty, accepts, improvements, delta, time).
+        """
+        return {
+            "phases": dict(self.phases),
+            "operators": {name: dict(vars(stats)) for name, stats in self.operators.items()},
+        }
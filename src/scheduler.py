@@ -0,0 +1,103 @@
+import math
+import random
+import time
+import utils
+
+EPSILON = 0.1  # Probability of drawing a uniformly random operator instead of following the policy
+TEMPERATURE = 0.2  # Softmax temperature, relative to the value of the best operator
+WINDOW = 200  # Proposals of an operator over which its recent value is averaged
+POLICIES = ["epsilon-greedy", "softmax"]
+
+
+class OperatorScheduler:
+    """
+    Adaptive choice among the neighbour operators of utils.PROPOSERS, used in place of the
+    uniform draw of utils.random_move.
+
+    The value of an operator is its recent improvement per second: the average gain of
+    its proposals, max(delta, 0), divided by their average time. Both averages are
+    exponentially weighted over about WINDOW proposals of the operator, so operators that
+    stop paying off, like new_pizzas once no team is free, quickly lose their share of the
+    proposals. Every operator is tried once before the policy is applied, and a share
+    epsilon of the operators is then still drawn uniformly, so that no operator starves and
+    one which becomes useful again is noticed.
+    As the values depend on measured times, runs with a scheduler are not exactly reproducible.
+    """
+    def __init__(self, policy="epsilon-greedy", epsilon=EPSILON, temperature=TEMPERATURE, window=WINDOW):
+        """
+        Parameters:
+            policy (str): "epsilon-greedy" chooses the best operator; "softmax" draws operators
+                with probability proportional to exp((value / best value - 1) / temperature)
+            epsilon (float): Probability of a uniformly random operator instead of the policy
+            temperature (float): Temperature of the softmax policy
+            window (int): Decay window of the averages, in proposals of the operator
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown operator selection policy: {policy}")
+        self.policy = policy
+        self.epsilon = epsilon
+        self.temperature = temperature
+        self.window = window
+        num_operators = len(utils.PROPOSERS)
+        self.calls = [0] * num_operators
+        self.gain = [0.0] * num_operators  # Recent average improvement of a proposal
+        self.cost = [0.0] * num_operators  # Recent average seconds of a proposal
+        self.values = [0.0] * num_operators  # gain / cost, kept up to date by random_move
+        self.untried = list(range(num_operators))
+        random.shuffle(self.untried)
+
+    def choose(self):
+        """
+        Returns the index in utils.PROPOSERS of the next operator.
+        """
+        if self.untried:
+            return self.untried.pop()
+        if random.random() < self.epsilon:
+            return random.randrange(len(self.values))
+        best = max(self.values)
+        if self.policy == "epsilon-greedy":
+            return random.choice([k for k, value in enumerate(self.values) if value == best])
+        if best <= 0:
+            return random.randrange(len(self.values))
+        weights = [math.exp((value / best - 1) / self.temperature) for value in self.values]
+        return random.choices(range(len(self.values)), weights)[0]
+
+    def random_move(self, solution):
+        """
+        Proposes a move from the chosen operator and updates the value of that operator.
+
+        Parameters:
+            solution (Solution): Current solution.
+
+        Returns:
+            move (Move): Proposed move, or None if the chosen operator has no valid move.
+        """
+        k = self.choose()
+        start = time.perf_counter()
+        move = utils.PROPOSERS[k](solution)
+        elapsed = time.perf_counter() - start
+
+        self.calls[k] += 1
+        rate = max(1 / self.calls[k], 1 / self.window)
+        gain = move.delta if move is not None and move.delta > 0 else 0
+        self.gain[k] += rate * (gain - self.gain[k])
+        self.cost[k] += rate * (elapsed - self.cost[k])
+        self.values[k] = self.gain[k] / self.cost[k] if self.cost[k] > 0 else 0.0
+        return move
+
+    def getstate(self):
+        """
+        Returns the learnt state of the scheduler, saved in checkpoints.
+        """
+        return {"calls": self.calls, "gain": self.gain, "cost": self.cost,
+                "values": self.values, "untried": self.untried}
+
+    def setstate(self, state):
+        """
+        Restores a state returned by getstate, so that a resumed run keeps what was learnt.
+        """
+        self.calls = list(state["calls"])
+        self.gain = list(state["gain"])
+        self.cost = list(state["cost"])
+        self.values = list(state["values"])
+        self.untried = list(state["untried"])
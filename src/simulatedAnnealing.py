@@ -1,82 +1,233 @@
-import copy  
 import math  
 import random 
-import matplotlib.pyplot as plt  
 from utils import * 
+from control import SearchControl
 
-def calculate_temperature(initial_temperature, iteration, cooling_option):
+TARGET_ACCEPTANCE = 0.5  # Share of worsening moves accepted at the initial temperature
+CALIBRATION_SAMPLES = 200  # Moves sampled to calibrate a temperature
+FINAL_TEMPERATURE_RATIO = 1e-3  # Temperature at the end of the schedule, relative to the initial one
+STAGNATION = 0.1  # Share of the budget without a new best score that triggers a reheat
+REHEAT_ACCEPTANCE = 0.2  # Target acceptance used to recalibrate the temperature when reheating
+REPLAY_LIMIT = 10000  # Moves kept in since_best before the best solution is copied instead
+
+def calibrate_temperature(solution, target_acceptance=TARGET_ACCEPTANCE, samples=CALIBRATION_SAMPLES):
+    """
+    Calibrates a temperature from the deltas of sampled moves, so that a worsening move of
+    average size is accepted with probability target_acceptance. This adapts the schedule
+    to the score scale of the instance.
+    
+    Parameters:
+        solution (object): Solution the moves are sampled from; it is not changed
+        target_acceptance (float): Acceptance probability of an average worsening move,
+            strictly between 0 and 1
+        samples (int): Number of moves sampled
+        
+    Returns:
+        temperature (float): Calibrated temperature
+    """
+    if not 0 < target_acceptance < 1:
+        raise ValueError(f"The target acceptance must be strictly between 0 and 1, not {target_acceptance}")
+    worsening = []
+    for _ in range(samples):
+        move = random_move(solution)
+        if move is not None and move.delta < 0:
+            worsening.append(-move.delta)
+    if not worsening:
+        return 1.0
+    return (sum(worsening) / len(worsening)) / -math.log(target_acceptance)
+
+def calculate_temperature(initial_temperature, progress, cooling_option):
     """
-    Calculates the temperature for the next iteration based on the chosen cooling option.
+    Calculates the temperature at a point of the schedule based on the chosen cooling option.
+    Every schedule starts at initial_temperature and ends at FINAL_TEMPERATURE_RATIO times it.
     
     Parameters:
         initial_temperature (float): Initial temperature
-        iteration (int): Current iteration number
+        progress (float): Share of the budget used, from 0 to 1
         cooling_option (int): Option for cooling schedule
         
     Returns:
-        temperature (float): Temperature for the next iteration
+        temperature (float): Temperature at this point of the schedule
     """
+    scale = 1 / FINAL_TEMPERATURE_RATIO - 1
     if cooling_option == 1:
-        return initial_temperature * 0.85 ** iteration
+        return initial_temperature * FINAL_TEMPERATURE_RATIO ** progress
     elif cooling_option == 2:
-        return initial_temperature / (1 + 5 * math.log(1 + iteration))
+        return initial_temperature / (1 + scale * math.log(1 + (math.e - 1) * progress))
     elif cooling_option == 3:
-        return initial_temperature / (1 + 1.5 * iteration) 
+        return initial_temperature / (1 + scale * progress) 
     else:
-        return initial_temperature / (1 + 0.5 * iteration ** 2)
+        return initial_temperature / (1 + scale * progress ** 2)
 
-def simulated_annealing(pizzas, team_sizes, iterations, cooling_option=1):
+def best_solution_copy(solution, since_best):
+    """
+    Returns a copy of the best solution, rebuilt by reverting on a copy of the current
+    solution the moves applied since the best. The moves themselves are left untouched.
+    """
+    best_solution = solution.copy()
+    for move in reversed(since_best):
+        replay = Move(move.operator, move.args, move.delta)
+        replay.undo = move.undo
+        revert_move(best_solution, replay)
+    return best_solution
+
+def simulated_annealing(pizzas, team_sizes, iterations, cooling_option=1, initializer="Random", plot=False,
+                        target_acceptance=TARGET_ACCEPTANCE, reheat=False, control=None, checkpoint=None, profiler=None,
+                        scheduler=None, output=None):
     """
     Performs Simulated Annealing algorithm for optimizing pizza delivery routes.
+    The initial temperature is calibrated from sampled move deltas and the schedule
+    runs over the wall-clock budget of control when it has a deadline, otherwise over the iterations.
     
     Parameters:
         pizzas (list): List of pizzas
         team_sizes (list): List of team sizes
-        iterations (int): Number of iterations
+        iterations (int): Maximum number of iterations, or None to run until the deadline of control
         cooling_option (int): Option for cooling schedule
+        initializer (str): Constructor of the initial solution ("Random" or "Greedy")
+        plot (bool): If True, shows the performance graph when the search ends
+        target_acceptance (float): Acceptance probability of an average worsening move at the start,
+            strictly between 0 and 1
+        reheat (bool): If True, recalibrates the temperature and restarts the schedule when the
+            best score has not improved for STAGNATION of the budget
+        control (SearchControl): Deadline, cancellation and best-so-far callback of the run
+        checkpoint (Checkpoint): Periodic checkpoints of the search state, restored if the run is resumed.
+            A resumed run continues exactly when the schedule follows the iterations.
+        profiler (Profiler): Collects operator counters and phase timings of the run
+        scheduler (OperatorScheduler): Adaptive choice of the neighbour operators; they are drawn uniformly if None.
+        output (str): Path of the solution file, written atomically when the search ends, or None.
+            Temperatures are always calibrated on uniformly drawn moves.
         
     Returns:
         final_solution (object): Best solution found
         final_score (float): Score of the best solution
+        report (dict): Run report of the profiler, returned only if profiler is given
     """
-    curr_solution = randomize_deliveries(pizzas, team_sizes)
-    curr_score = evaluation_function(curr_solution)
-    curr_iteration = 0
-    initial_temperature = 1000
+    control = control or SearchControl()
+    if iterations is None and control.deadline is None:
+        raise ValueError("simulated_annealing needs iterations or a deadline to set its schedule")
+    if not 0 < target_acceptance < 1:
+        raise ValueError(f"target_acceptance must be strictly between 0 and 1, not {target_acceptance}")
+    if profiler:
+        profiler.begin("init")
+
     temperatures = []
     explored_nodes = []
     best_nodes = []
-    best_score = curr_score
+    since_best = []  # Moves applied since the best solution, reverted at the end to return it
+    best_snapshot = None  # Copy of the best solution, from a checkpoint or a too long since_best, until a better one is found
+
+    state = checkpoint.restore("simulated_annealing") if checkpoint else None
+    if state is None:
+        curr_solution = initial_solution(pizzas, team_sizes, initializer)
+        curr_iteration = 0
+        initial_temperature = calibrate_temperature(curr_solution, target_acceptance)
+        schedule_start = 0  # Progress at which the current schedule started; moved by reheats
+        last_improvement = 0  # Progress of the last new best score
+    else:
+        random.setstate(state["random"])
+        curr_solution = decode_solution(state["current"], pizzas)
+        curr_iteration = state["iteration"]
+        initial_temperature = state["initial_temperature"]
+        schedule_start = state["schedule_start"]
+        last_improvement = state["last_improvement"]
+        if scheduler and state["scheduler"]:
+            scheduler.setstate(state["scheduler"])
+        if state["best"] is not None:
+            best_snapshot = decode_solution(state["best"], pizzas)
+    curr_score = evaluation_function(curr_solution)
+    best_score = best_snapshot.score if best_snapshot is not None else curr_score
+
+    def best_solution():
+        if best_snapshot is not None:
+            return best_snapshot
+        return best_solution_copy(curr_solution, since_best) if since_best else curr_solution
     
-    while curr_iteration < iterations:
+    propose = scheduler.random_move if scheduler else random_move
+    if profiler:
+        profiler.begin("search")
+    while (iterations is None or curr_iteration < iterations) and not control.should_stop():
         curr_iteration += 1
-        temperature = calculate_temperature(initial_temperature, curr_iteration, cooling_option)
-        temperatures.append(temperature)
-        if temperature == 0: break
-        neighbour, neighbour_score = generate_neighbour_random(copy.deepcopy(curr_solution), curr_score)
+        progress = control.progress()
+        if progress is None:
+            progress = curr_iteration / iterations
+
+        if reheat and progress - last_improvement > STAGNATION and progress < 1:
+            initial_temperature = calibrate_temperature(curr_solution, REHEAT_ACCEPTANCE)
+            schedule_start = progress
+            last_improvement = progress
+
+        temperature = calculate_temperature(initial_temperature, (progress - schedule_start) / (1 - schedule_start),
+                                            cooling_option)
+        move = propose(curr_solution)
         
-        if neighbour_score > curr_score:
-            curr_solution = neighbour
-            curr_score = neighbour_score
-            best_score = curr_score
-        else:
-            probability = math.exp((neighbour_score - curr_score) / temperature)
-            if random.random() < probability:
-                curr_solution = neighbour
-                curr_score = neighbour_score
-                
-        explored_nodes.append(curr_score)
-        best_nodes.append(best_score)
+        if move is not None and (move.delta >= 0 or random.random() < math.exp(move.delta / temperature)):
+            apply_move(curr_solution, move)
+            curr_score = curr_solution.score
+            if curr_score > best_score:
+                best_score = curr_score
+                since_best = []
+                best_snapshot = None
+                last_improvement = progress
+            elif best_snapshot is None:
+                since_best.append(move)
+                if len(since_best) > REPLAY_LIMIT:
+                    # Long runs without a new best would keep too many moves: copy the best once instead
+                    best_snapshot = best_solution_copy(curr_solution, since_best)
+                    since_best = []
+
+        if plot:  # Without a graph to draw, long runs keep no per-iteration history
+            temperatures.append(temperature)
+            explored_nodes.append(curr_score)
+            best_nodes.append(best_score)
+        if control.due(best_score):
+            control.report(best_solution(), best_score)
+        if checkpoint and checkpoint.due():
+            best = best_solution()
+            checkpoint.save("simulated_annealing", {
+                "random": random.getstate(), "iteration": curr_iteration,
+                "current": encode_solution(curr_solution),
+                "best": None if best is curr_solution else encode_solution(best),
+                "initial_temperature": initial_temperature, "schedule_start": schedule_start,
+                "last_improvement": last_improvement,
+                "scheduler": scheduler.getstate() if scheduler else None})
+
+    if best_snapshot is not None:
+        curr_solution = best_snapshot
+    for move in reversed(since_best):
+        revert_move(curr_solution, move)
         
+    if profiler:
+        profiler.end()
+
+    if output:
+        write_solution(curr_solution, output, profiler)
+
     # Plot the performance graph
+    if plot:
+        show_graph(explored_nodes, best_nodes, temperatures)
+    
+    if profiler:
+        return curr_solution, curr_solution.score, profiler.report()
+    return curr_solution, curr_solution.score
+
+def show_graph(explored_nodes, best_nodes, temperatures):
+    """
+    Plots the performance graph.
+    
+    Parameters:
+        explored_nodes (list): Score of the current solution at each iteration
+        best_nodes (list): Best score at each iteration
+        temperatures (list): Temperature at each iteration
+    """
+    import matplotlib.pyplot as plt
+
     plt.plot(range(1, len(explored_nodes) + 1), explored_nodes, label='Explored Nodes')
     plt.plot(range(1, len(best_nodes) + 1), best_nodes, label='Best Nodes')
-    plt.plot(range(1, curr_iteration + 1), temperatures, label="Temperature evolution")    
+    plt.plot(range(1, len(temperatures) + 1), temperatures, label="Temperature evolution")    
     plt.xlabel('Iteration')
     plt.ylabel('Solution Score')
     plt.title('Evolution of the Simulated Annealing algorithm')
     plt.legend()
     plt.grid(True)
     plt.show()
-    
-    return curr_solution, curr_score
@@ -0,0 +1,25 @@
+import importlib
+
+# Algorithm name -> (module, entry point). Modules are imported only when an algorithm is chosen,
+# so that callers which never plot or evolve populations do not pay for their imports.
+ALGORITHMS = {
+    "hill-climbing": ("hillclimbing", "hill_climbing"),
+    "simulated-annealing": ("simulatedAnnealing", "simulated_annealing"),
+    "tabu-search": ("tabusearch", "tabu_search"),
+    "genetic": ("genetic", "genetic_algorithm"),
+    "genetic-numpy": ("geneticnumpy", "genetic_algorithm"),
+    "guided-local-search": ("guidedlocalsearch", "guided_local_search"),
+}
+
+def load_algorithm(name):
+    """
+    Returns the entry point of an algorithm.
+
+    Parameters:
+        name (str): Key of ALGORITHMS.
+
+    Returns:
+        algorithm (function): Function called as algorithm(pizzas, team_sizes, **parameters).
+    """
+    module_name, function_name = ALGORITHMS[name]
+    return getattr(importlib.import_module(module_name), function_name)
@@ -1,107 +1,217 @@
+import random
 import utils
-import copy
-import matplotlib.pyplot as plt
+from control import SearchControl
 
-def update_tabu_list(tabu_list, curr_solution, tabu_tenure):
+# Aspiration criteria: whether a tabu move is allowed anyway, given its delta, the current score and the best score
+ASPIRATION_CRITERIA = {
+    "best": lambda delta, curr_score, best_score: curr_score + delta > best_score,
+    "improving": lambda delta, curr_score, best_score: delta > 0,
+    "none": lambda delta, curr_score, best_score: False,
+}
+
+def move_attributes(solution, move):
     """
-    Updates the tabu list with the current solution.
+    Returns the tabu attributes of a move. A move and the move that undoes it share
+    their attributes: swaps are keyed by the unordered pair of pizzas they exchange,
+    and adding or removing a team by (pizza index, 0) for each of its pizzas, where
+    0 stands for the unused pizzas (pizza indices start at 1).
     
     Parameters:
-        tabu_list (dict): Tabu list containing solutions and their tabu tenure
-        curr_solution (object): Current solution to be added to the tabu list
-        tabu_tenure (int): Number of iterations a solution stays in the tabu list
+        solution (Solution): Solution the move was proposed for
+        move (Move): Proposed move
         
     Returns:
-        tabu_list (dict): Updated tabu list
+        attributes (tuple): Tabu attributes of the move
     """
-    tabu_list[curr_solution] = tabu_tenure
+    if move.operator == "swap_pizza_between_teams":
+        i, n1, j, n2 = move.args
+        first, second = solution.solution[i].pizzas[n1].index, solution.solution[j].pizzas[n2].index
+    elif move.operator == "swap_1_unused":
+        i, n1, n2 = move.args
+        first, second = solution.solution[i].pizzas[n1].index, solution.unused_pizzas[n2].index
+    else:
+        team = move.args[0] if move.operator == "new_pizzas" else solution.solution[move.args[0]]
+        return tuple((pizza.index, 0) for pizza in team.pizzas)
+    return ((min(first, second), max(first, second)),)
 
-    for sol in list(tabu_list.keys()):
-        tabu_list[sol] -= 1
-        if tabu_list[sol] <= 0:
-            del tabu_list[sol]
+def update_tabu_list(tabu_list, attributes, iteration, tabu_tenure):
+    """
+    Makes the attributes of an applied move tabu for the next tabu_tenure iterations.
+    Every tabu_tenure iterations the entries that have expired are dropped, so the
+    tabu list holds at most two tenures' worth of moves however long the search runs.
+    
+    Parameters:
+        tabu_list (dict): Tabu list mapping each attribute to the first iteration it is no longer tabu
+        attributes (tuple): Attributes of the applied move and the fingerprint of the solution it led to
+        iteration (int): Current iteration
+        tabu_tenure (int): Number of iterations an attribute stays tabu
+        
+    Returns:
+        tabu_list (dict): Updated tabu list
+    """
+    if iteration % max(tabu_tenure, 1) == 0:
+        tabu_list = {attribute: end for attribute, end in tabu_list.items() if end > iteration}
+    for attribute in attributes:
+        tabu_list[attribute] = iteration + tabu_tenure + 1  # Tabu from iteration + 1 to iteration + tabu_tenure
     return tabu_list
 
-def get_candidate_solution(neighbourhood, tabu_list):
+def is_tabu(tabu_list, attributes, iteration):
     """
-    Returns the best candidate solution from the neighbourhood that is not in the tabu list.
+    Checks whether any attribute of a move is still tabu at the given iteration.
+    Entries that have expired but are not purged yet by update_tabu_list are ignored.
+    """
+    for attribute in attributes:
+        if tabu_list.get(attribute, 0) > iteration:
+            return True
+    return False
+
+def get_candidate_move(solution, candidates, tabu_list, iteration, curr_score, best_score, aspiration="best"):
+    """
+    Returns the best admissible move among the candidates: a move that is not tabu,
+    or a tabu move accepted by the aspiration criterion.
     
     Parameters:
-        neighbourhood (list): List of neighbouring solutions
-        tabu_list (dict): Tabu list containing solutions and their tabu tenure
+        solution (Solution): Current solution
+        candidates (iterable): Proposed moves
+        tabu_list (dict): Tabu list mapping each attribute to the first iteration it is no longer tabu
+        iteration (int): Current iteration
+        curr_score (float): Score of the current solution
+        best_score (float): Best score found so far
+        aspiration (str): Aspiration criterion, a key of ASPIRATION_CRITERIA
         
     Returns:
-        new_solution (object): Best candidate solution found
-        new_solution_score (float): Score of the best candidate solution
+        new_move (Move): Best admissible move, or None if every candidate is tabu
+        new_attributes (tuple): Tabu attributes of the move, followed by the fingerprint it leads to
     """
-    new_solution = None
-    new_solution_score = 0 
-    
-    for neighbour in neighbourhood:
-        neighbour_score = utils.evaluation_function(neighbour)
+    aspirates = ASPIRATION_CRITERIA[aspiration]
+    new_move = None
+    new_attributes = ()
 
-        if (neighbour_score > new_solution_score) and (neighbour not in tabu_list):
-            new_solution = neighbour
-            new_solution_score = neighbour_score
+    for move in candidates:
+        if new_move is not None and move.delta <= new_move.delta:
+            continue
+        # The fingerprint of the solution the move leads to makes revisiting a recent solution tabu too
+        attributes = move_attributes(solution, move) + (utils.move_fingerprint(solution, move),)
+        if not is_tabu(tabu_list, attributes, iteration) or aspirates(move.delta, curr_score, best_score):
+            new_move = move
+            new_attributes = attributes
 
-    return new_solution, new_solution_score
+    return new_move, new_attributes
 
-def tabu_search(pizzas, team_sizes, iterations, tabu_tenure):
+def tabu_search(pizzas, team_sizes, iterations, tabu_tenure, initializer="Random", plot=False, aspiration="best",
+                neighbourhood_size=utils.NEIGHBOURHOOD_SIZE, control=None, checkpoint=None, profiler=None,
+                output=None):
     """
     Performs Tabu Search algorithm for optimizing pizza delivery routes.
+    Each iteration applies the best admissible move of the neighbourhood, even if it
+    lowers the score, and makes the attributes of that move and the solution it
+    leads to (by fingerprint) tabu.
     
     Parameters:
         pizzas (list): List of pizzas
         team_sizes (list): List of team sizes
-        iterations (int): Number of iterations
-        tabu_tenure (int): Number of iterations a solution stays in tabu list
+        iterations (int): Number of iterations, or None to run until control stops the search
+        tabu_tenure (int): Number of iterations the attributes of a move stay tabu
+        initializer (str): Constructor of the initial solution ("Random" or "Greedy")
+        plot (bool): If True, shows the performance graph when the search ends
+        aspiration (str): Aspiration criterion for tabu moves: "best" (beats the best score),
+            "improving" (improves the current score) or "none"
+        neighbourhood_size (int): Number of candidate moves sampled per iteration
+        control (SearchControl): Deadline, cancellation and best-so-far callback of the run
+        checkpoint (Checkpoint): Periodic checkpoints of the search state, restored if the run is resumed
+        profiler (Profiler): Collects operator counters and phase timings of the run
+        output (str): Path of the solution file, written atomically when the search ends, or None
         
     Returns:
         final_solution (object): Best solution found
         final_score (float): Score of the best solution
+        report (dict): Run report of the profiler, returned only if profiler is given
     """
-    curr_solution = utils.randomize_deliveries(pizzas, team_sizes)
+    control = control or SearchControl()
+    if profiler:
+        profiler.begin("init")
+    state = checkpoint.restore("tabu_search") if checkpoint else None
+    if state is None:
+        curr_solution = utils.initial_solution(pizzas, team_sizes, initializer)
+        best_solution = curr_solution.copy()
+        tabu_list = {curr_solution.fingerprint: tabu_tenure}
+        curr_iteration = 0
+    else:
+        random.setstate(state["random"])
+        curr_solution = utils.decode_solution(state["current"], pizzas)
+        best_solution = utils.decode_solution(state["best"], pizzas)
+        tabu_list = state["tabu_list"]
+        curr_iteration = state["iteration"]
     curr_score = utils.evaluation_function(curr_solution)
-  
-    best_solution = copy.deepcopy(curr_solution)
-    best_score = curr_score
+    best_score = best_solution.score
     
-    tabu_list = {}
     explored_nodes = []  
     best_nodes = []     
 
-    curr_iteration = 0
+    if profiler:
+        profiler.begin("search")
+    while (iterations is None or curr_iteration < iterations) and not control.should_stop():
 
-    while curr_iteration < iterations:
+        candidates = utils.generate_neighbourhood(curr_solution, neighbourhood_size)
 
-        tabu_list = update_tabu_list(tabu_list, curr_solution, tabu_tenure)
-        
-        neighbourhood = utils.generate_neighbourhood(curr_solution)
-
-        new_solution, new_solution_score = get_candidate_solution(neighbourhood, tabu_list)
+        new_move, attributes = get_candidate_move(curr_solution, candidates, tabu_list, curr_iteration,
+                                                  curr_score, best_score, aspiration)
   
-        if new_solution is not None:
-            curr_solution = new_solution
-            curr_score = new_solution_score
+        if new_move is not None:
+            utils.apply_move(curr_solution, new_move)
+            curr_score += new_move.delta
+            tabu_list = update_tabu_list(tabu_list, attributes, curr_iteration, tabu_tenure)
    
             if curr_score > best_score:
-                best_solution = copy.deepcopy(curr_solution)
+                best_solution = curr_solution.copy()
                 best_score = curr_score
 
         else:
-            curr_solution = utils.randomize_deliveries(pizzas, team_sizes)
+            # Every candidate is tabu: restart from a new solution of the chosen constructor
+            curr_solution = utils.initial_solution(pizzas, team_sizes, initializer)
             curr_score =  utils.evaluation_function(curr_solution)
   
-        explored_nodes.append(curr_score) 
-        best_nodes.append(best_score)
+        if plot:
+            explored_nodes.append(curr_score)
+            best_nodes.append(best_score)
+        if control.due(best_score):
+            control.report(best_solution, best_score)
 
         curr_iteration += 1
+        if checkpoint and checkpoint.due():
+            # Expired entries behave like missing ones, so they are left out
+            active = {attribute: end for attribute, end in tabu_list.items() if end > curr_iteration}
+            checkpoint.save("tabu_search", {"random": random.getstate(), "iteration": curr_iteration,
+                                            "current": utils.encode_solution(curr_solution),
+                                            "best": utils.encode_solution(best_solution), "tabu_list": active})
     
-    # Print final solution and score
-    print(curr_solution)
+    if profiler:
+        profiler.end()
+
+    # Print final score
     print(curr_score)
 
+    if output:
+        utils.write_solution(best_solution, output, profiler)
+
     # Plot the performance graph
+    if plot:
+        show_graph(explored_nodes, best_nodes)
+
+    if profiler:
+        return best_solution, best_score, profiler.report()
+    return best_solution, best_score
+
+def show_graph(explored_nodes, best_nodes):
+    """
+    Plots the performance graph.
+    
+    Parameters:
+        explored_nodes (list): Score of the current solution at each iteration
+        best_nodes (list): Best score at each iteration
+    """
+    import matplotlib.pyplot as plt
+
     plt.plot(range(1, len(explored_nodes) + 1), explored_nodes, label='Explored Nodes')
     plt.plot(range(1, len(best_nodes) + 1), best_nodes, label='Best Nodes')
     plt.xlabel('Iteration')
@@ -110,5 +220,3 @@ def tabu_search(pizzas, team_sizes, iterations, tabu_tenure):
     plt.legend()
     plt.grid(True)
     plt.show()
-
-    return best_solution, best_score
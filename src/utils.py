@@ -1,181 +1,463 @@
+import os
 import random
+import re
 import copy
-from models import Pizza, Delivery, Solution
+import time
+from array import array
+from models import OUTPUT_DIR, Delivery, Solution, Move, PizzaPool, mix64, popcount
+from instance import load_instance
+
+GREEDY_SAMPLE_SIZE = 50  # Candidates examined per team slot by greedy_deliveries
+NEIGHBOURHOOD_SIZE = 100  # Moves sampled per iteration by generate_neighbourhood
+
+move_observer = None  # Called as move_observer(move) after each applied move; set by profiling.Profiler
 
 def parse_file(file_path):
     """
     Parse input file and extract pizzas and team sizes.
+    The file is loaded through the columnar instance cache (see instance.load_instance),
+    so only the first load of a file tokenises its text.
 
     Parameters:
         file_path (str): Path to the input file.
 
     Returns:
-        pizzas (set): Set of Pizza objects.
+        pizzas (list): List of Pizza objects, in file order.
         team_sizes (list): List of team sizes.
     """
-    with open(file_path, 'r') as file:
-        i = 0
-        team_sizes = list(map(int, file.readline().split()))[1:]
-        pizzas = set()
+    instance = load_instance(file_path)
+    return instance.build_pizzas(), list(instance.team_sizes)
+
+def output_path(file_path, algorithm, seed, directory=OUTPUT_DIR):
+    """
+    Returns the path of the solution file of a run, named after the instance, the
+    algorithm and the seed, so that runs with different settings do not overwrite
+    each other. Without a seed the time and process id keep the name unique.
 
-        for line in file:
-            i += 1
-            pizza_data = line.split()
-            num_ingredients = int(pizza_data[0])
-            ingredients = pizza_data[1:]
-            pizzas.add(Pizza(i, num_ingredients, ingredients))
+    Parameters:
+        file_path (str): Path to the input file.
+        algorithm (str): Name of the algorithm.
+        seed (int): Seed of the run, or None.
+        directory (str): Folder of the solution file.
 
-    return pizzas, team_sizes
+    Returns:
+        path (str): Path of the solution file.
+    """
+    instance_name = os.path.splitext(os.path.basename(file_path))[0]
+    algorithm_name = re.sub(r"[^a-z0-9]+", "-", algorithm.lower()).strip("-")
+    run = f"seed{seed}" if seed is not None else f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    return os.path.join(directory, f"{instance_name}_{algorithm_name}_{run}.txt")
+
+def write_solution(solution, path, profiler=None):
+    """
+    Writes a solution file atomically, timed as the "write" phase of profiler if given.
+    """
+    if profiler:
+        profiler.begin("write")
+    solution.write(path)
+    if profiler:
+        profiler.end()
 
 def randomize_deliveries(pizzas, team_sizes):
     """
     Randomly allocate pizzas to delivery teams.
 
     Parameters:
-        pizzas (set): Set of Pizza objects.
-        team_sizes (list): List of team sizes.
+        pizzas (list): List of Pizza objects.
+        team_sizes (list): List of team sizes. It is not modified.
 
     Returns:
         solution (Solution): Initial solution containing deliveries.
     """
+    team_sizes = list(team_sizes)
     deliveries = []
     shuffled_pizzas = list(pizzas)
     random.shuffle(shuffled_pizzas)
+    start = 0
 
     while True:
-        random_index = random.randint(0, 2)
-        team_size = random_index + 2
-
-        if team_sizes[0] == 0 and team_sizes[1] == 0 and team_sizes[2] == 0:
+        available_sizes = [index for index in range(3) if team_sizes[index] > 0]
+        if len(available_sizes) == 0:
             break
 
-        if team_sizes[random_index] == 0:
-            continue
+        random_index = random.choice(available_sizes)
+        team_size = random_index + 2
+        remaining = len(shuffled_pizzas) - start
 
-        if len(shuffled_pizzas) < team_size:
-            if len(shuffled_pizzas) == 3 and team_sizes[1] > 0:
-                deliveries.append(Delivery(3, shuffled_pizzas))
+        if remaining < team_size:
+            if remaining == 3 and team_sizes[1] > 0:
+                deliveries.append(Delivery(3, shuffled_pizzas[start:]))
                 team_sizes[1] -= 1
-                shuffled_pizzas = shuffled_pizzas[3:]
-            if len(shuffled_pizzas) == 2 and team_sizes[0] > 0:
-                deliveries.append(Delivery(2, shuffled_pizzas))
+                start += 3
+            elif remaining == 2 and team_sizes[0] > 0:
+                deliveries.append(Delivery(2, shuffled_pizzas[start:]))
                 team_sizes[0] -= 1
-                shuffled_pizzas = shuffled_pizzas[2:]
+                start += 2
             break
 
         team_sizes[random_index] -= 1
-        pizzas_for_delivery = shuffled_pizzas[:team_size]
-        shuffled_pizzas = shuffled_pizzas[team_size:]
-        deliveries.append(Delivery(team_size, pizzas_for_delivery))
+        deliveries.append(Delivery(team_size, shuffled_pizzas[start:start + team_size]))
+        start += team_size
 
-    return Solution(deliveries, shuffled_pizzas, team_sizes[0], team_sizes[1], team_sizes[2])
+    return Solution(deliveries, shuffled_pizzas[start:], team_sizes[0], team_sizes[1], team_sizes[2])
 
-def swap_pizza_between_teams_random(solution, curr_score):
+def greedy_deliveries(pizzas, team_sizes, sample_size=GREEDY_SAMPLE_SIZE):
     """
-    Switches a pizza between two random teams.
+    Greedily builds deliveries, filling teams of 4, then 3, then 2.
+    Each team starts from the unused pizza with the most ingredients and every
+    other slot takes the candidate adding the most new ingredients (ties go to
+    the pizza with fewer ingredients, which wastes less). When more than
+    sample_size pizzas are left, the candidates are a random window of
+    sample_size pizzas from the shuffled pool of unused pizzas.
+
+    Parameters:
+        pizzas (list): List of Pizza objects.
+        team_sizes (list): List of team sizes. It is not modified.
+        sample_size (int): Number of candidates examined per slot.
+
+    Returns:
+        solution (Solution): Initial solution containing deliveries.
+    """
+    team_sizes = list(team_sizes)
+    by_ingredients = sorted(pizzas, key=lambda pizza: pizza.num_ingredient, reverse=True)
+    shuffled_pizzas = list(pizzas)
+    random.shuffle(shuffled_pizzas)
+    unused = PizzaPool(shuffled_pizzas)
+    next_seed = 0
+    deliveries = []
+
+    for size_index in (2, 1, 0):
+        team_size = size_index + 2
+        while team_sizes[size_index] > 0 and len(unused) >= team_size:
+            while by_ingredients[next_seed] not in unused:
+                next_seed += 1
+            team = [by_ingredients[next_seed]]
+            unused.remove(team[0])
+            team_mask = team[0].mask
+
+            for _ in range(team_size - 1):
+                if len(unused) <= sample_size:
+                    candidates = unused
+                else:
+                    start = random.randrange(len(unused) - sample_size + 1)
+                    candidates = unused[start:start + sample_size]
+                missing = ~team_mask
+                best = None
+                best_gain = -1
+                for pizza in candidates:
+                    gain = popcount(pizza.mask & missing)
+                    if gain > best_gain or (gain == best_gain and pizza.num_ingredient < best.num_ingredient):
+                        best = pizza
+                        best_gain = gain
+                unused.remove(best)
+                team.append(best)
+                team_mask |= best.mask
+
+            deliveries.append(Delivery(team_size, team))
+            team_sizes[size_index] -= 1
+
+    return Solution(deliveries, unused, team_sizes[0], team_sizes[1], team_sizes[2])
+
+INITIALIZERS = {"Random": randomize_deliveries, "Greedy": greedy_deliveries}
+
+def initial_solution(pizzas, team_sizes, initializer="Random"):
+    """
+    Builds the starting solution of a search.
+
+    Parameters:
+        pizzas (list): List of Pizza objects.
+        team_sizes (list): List of team sizes.
+        initializer (str): Name of the constructor in INITIALIZERS ("Random" or "Greedy").
+
+    Returns:
+        solution (Solution): Initial solution containing deliveries.
+    """
+    return INITIALIZERS[initializer](pizzas, team_sizes)
+
+def propose_swap_pizza_between_teams(solution):
+    """
+    Proposes switching a pizza between two random teams.
 
     Parameters:
         solution (Solution): Current solution.
-        curr_score (float): Current score of the solution.
 
     Returns:
-        solution (Solution): Updated solution after the swap.
-        curr_score (float): Updated score of the solution.
+        move (Move): Proposed move, or None if there is no team.
     """
     if len(solution.solution) == 0:
-        return Solution(solution.solution, solution.unused_pizzas, solution.free[0], solution.free[1], solution.free[2]), curr_score
+        return None
+
+    i = random.randrange(len(solution.solution))
+    j = random.randrange(len(solution.solution))
+    if i == j:
+        j = random.randrange(len(solution.solution))
+
+    first_team = solution.solution[i]
+    second_team = solution.solution[j]
+    n1 = random.randrange(first_team.team_size)
+    n2 = random.randrange(second_team.team_size)
+    if i == j:
+        # Reordering pizzas inside a team does not change its score
+        delta = 0
+    else:
+        delta = first_team.replace_delta(n1, second_team.pizzas[n2]) + second_team.replace_delta(n2, first_team.pizzas[n1])
+    return Move("swap_pizza_between_teams", (i, n1, j, n2), delta)
+
+def propose_swap_1_unused(solution):
+    """
+    Proposes switching one pizza in a team with an unused one.
 
-    first_team = random.choice(solution.solution)
-    second_team = random.choice(solution.solution)
-    if first_team == second_team:
-        second_team = random.choice(solution.solution)
+    Parameters:
+        solution (Solution): Current solution.
 
-    first_team_oldscore = len(set(ingredient for pizza in first_team.pizzas for ingredient in pizza.ingredients)) ** 2
-    second_team_oldscore = len(set(ingredient for pizza in second_team.pizzas for ingredient in pizza.ingredients)) ** 2
+    Returns:
+        move (Move): Proposed move, or None if there is no team or no unused pizza.
+    """
+    if len(solution.solution) == 0 or len(solution.unused_pizzas) == 0:
+        return None
 
-    curr_score = curr_score - first_team_oldscore - second_team_oldscore
+    i = random.randrange(len(solution.solution))
+    team = solution.solution[i]
+    n1 = random.randrange(team.team_size)
+    n2 = random.randrange(len(solution.unused_pizzas))
+    delta = team.replace_delta(n1, solution.unused_pizzas[n2])
+    return Move("swap_1_unused", (i, n1, n2), delta)
 
-    n1 = random.randint(1, first_team.team_size)
-    n2 = random.randint(1, second_team.team_size)
-    old_value = first_team.pizzas[n1 - 1] 
-    first_team.pizzas[n1 - 1] = second_team.pizzas[n2 - 1]
-    second_team.pizzas[n2 - 1] = old_value
+def propose_new_pizzas(solution):
+    """
+    Proposes adding a new team made of unused pizzas.
 
-    first_team_newscore = len(set(ingredient for pizza in first_team.pizzas for ingredient in pizza.ingredients)) ** 2
-    second_team_newscore = len(set(ingredient for pizza in second_team.pizzas for ingredient in pizza.ingredients)) ** 2
+    Parameters:
+        solution (Solution): Current solution.
 
-    curr_score = curr_score + first_team_newscore + second_team_newscore
+    Returns:
+        move (Move): Proposed move, or None if no free team can be filled.
+    """
+    free_sizes = []
+    if solution.free[0] > 0 and len(solution.unused_pizzas) > 1:
+        free_sizes.append(0)
+    if solution.free[1] > 0 and len(solution.unused_pizzas) > 2:
+        free_sizes.append(1)
+    if solution.free[2] > 0 and len(solution.unused_pizzas) > 3:
+        free_sizes.append(2)
 
-    return Solution(solution.solution, solution.unused_pizzas, solution.free[0], solution.free[1], solution.free[2]), curr_score
+    if len(free_sizes) == 0:
+        return None
 
-def swap_1_unused(solution, curr_score):
+    size_team = random.choice(free_sizes)
+    team = Delivery(size_team + 2, solution.unused_pizzas.sample(size_team + 2))
+    return Move("new_pizzas", (team,), team.score)
+
+def propose_remove_team(solution):
     """
-    Switches one pizza in a team with an unused one.
+    Proposes removing a random team.
 
     Parameters:
         solution (Solution): Current solution.
-        curr_score (float): Current score of the solution.
 
     Returns:
-        solution (Solution): Updated solution after the swap.
-        curr_score (float): Updated score of the solution.
+        move (Move): Proposed move, or None if there is no team.
     """
-    if len(solution.solution) == 0 or len(solution.unused_pizzas) == 0:
-        return Solution(solution.solution, solution.unused_pizzas, solution.free[0], solution.free[1], solution.free[2]), curr_score
+    if len(solution.solution) == 0:
+        return None
 
-    team = random.choice(solution.solution)
-    n1 = random.randint(1, team.team_size)
-    n2 = random.randint(1, len(solution.unused_pizzas))
+    i = random.randrange(len(solution.solution))
+    return Move("remove_team", (i,), -solution.solution[i].score)
 
-    team_oldscore = len(set(ingredient for pizza in team.pizzas for ingredient in pizza.ingredients)) ** 2
-    curr_score = curr_score - team_oldscore
+PROPOSERS = [propose_swap_pizza_between_teams, propose_new_pizzas, propose_remove_team, propose_swap_1_unused]
 
-    old_value = team.pizzas[n1 - 1]
-    team.pizzas[n1 - 1] = solution.unused_pizzas[n2 - 1]
-    solution.unused_pizzas.append(old_value)
-    solution.unused_pizzas.remove(team.pizzas[n1 - 1])
+def _swap_remove(items, position):
+    """
+    Removes items[position] in O(1) by moving the last item into its place.
+    """
+    last = items.pop()
+    if position < len(items):
+        removed = items[position]
+        items[position] = last
+        return removed
+    return last
+
+def _swap_insert(items, position, item):
+    """
+    Undoes _swap_remove(items, position).
+    """
+    if position < len(items):
+        items.append(items[position])
+        items[position] = item
+    else:
+        items.append(item)
 
-    team_newscore = len(set(ingredient for pizza in team.pizzas for ingredient in pizza.ingredients)) ** 2
-    curr_score = curr_score + team_newscore
+def _swap_between_teams(solution, move):
+    """
+    Performs a swap between two teams. The swap is its own inverse, so this also reverts it.
+    """
+    i, n1, j, n2 = move.args
+    first_team = solution.solution[i]
+    second_team = solution.solution[j]
+    if i == j:
+        solution.solution[i] = first_team.swapped(n1, n2)
+    else:
+        new_first = first_team.replaced(n1, second_team.pizzas[n2])
+        new_second = second_team.replaced(n2, first_team.pizzas[n1])
+        solution.solution[i], solution.solution[j] = new_first, new_second
+        solution.fingerprint ^= mix64(first_team.key) ^ mix64(new_first.key) ^ mix64(second_team.key) ^ mix64(new_second.key)
+
+def apply_move(solution, move):
+    """
+    Applies a move to the solution in place and records how to undo it.
 
-    return Solution(solution.solution, solution.unused_pizzas, solution.free[0], solution.free[1], solution.free[2]), curr_score
+    Parameters:
+        solution (Solution): Solution the move was proposed for.
+        move (Move): Move to apply.
+    """
+    if move.operator == "new_pizzas":
+        team, = move.args
+        for pizza in team.pizzas:
+            solution.unused_pizzas.remove(pizza)
+        solution.free[team.team_size - 2] -= 1
+        solution.solution.append(team)
+        solution.fingerprint ^= mix64(team.key)
+    elif move.operator == "remove_team":
+        i, = move.args
+        team = _swap_remove(solution.solution, i)
+        solution.free[team.team_size - 2] += 1
+        solution.unused_pizzas.extend(team.pizzas)
+        solution.fingerprint ^= mix64(team.key)
+        move.undo = team
+    elif move.operator == "swap_1_unused":
+        i, n1, n2 = move.args
+        team = solution.solution[i]
+        old_value = team.pizzas[n1]
+        solution.solution[i] = team.replaced(n1, solution.unused_pizzas.replace(n2, old_value))
+        solution.fingerprint ^= mix64(team.key) ^ mix64(solution.solution[i].key)
+        move.undo = old_value
+    else:
+        _swap_between_teams(solution, move)
+    solution.score += move.delta
+    if move_observer is not None:
+        move_observer(move)
+
+def revert_move(solution, move):
+    """
+    Reverts a move applied by apply_move. Moves must be reverted in reverse order of application.
 
-def new_pizzas(solution, curr_score):
+    Parameters:
+        solution (Solution): Solution the move was applied to.
+        move (Move): Move to revert.
     """
-    Adds a new set of pizzas to a team.
+    if move.operator == "new_pizzas":
+        team = solution.solution.pop()
+        solution.free[team.team_size - 2] += 1
+        solution.unused_pizzas.extend(team.pizzas)
+        solution.fingerprint ^= mix64(team.key)
+    elif move.operator == "remove_team":
+        team = move.undo
+        for pizza in team.pizzas:
+            solution.unused_pizzas.remove(pizza)
+        solution.free[team.team_size - 2] -= 1
+        _swap_insert(solution.solution, move.args[0], team)
+        solution.fingerprint ^= mix64(team.key)
+    elif move.operator == "swap_1_unused":
+        # Later moves may have reordered the pool, so find the pizza by its index
+        i, n1, n2 = move.args
+        team = solution.solution[i]
+        position = solution.unused_pizzas.position(move.undo)
+        solution.solution[i] = team.replaced(n1, solution.unused_pizzas.replace(position, team.pizzas[n1]))
+        solution.fingerprint ^= mix64(team.key) ^ mix64(solution.solution[i].key)
+    else:
+        _swap_between_teams(solution, move)
+    move.undo = None
+    solution.score -= move.delta
+
+def move_fingerprint(solution, move):
+    """
+    Returns the fingerprint the solution would have after applying move, in O(1).
+
+    Parameters:
+        solution (Solution): Solution the move was proposed for.
+        move (Move): Proposed move.
+
+    Returns:
+        fingerprint (int): Fingerprint after the move.
+    """
+    if move.operator == "new_pizzas":
+        return solution.fingerprint ^ mix64(move.args[0].key)
+    if move.operator == "remove_team":
+        return solution.fingerprint ^ mix64(solution.solution[move.args[0]].key)
+    if move.operator == "swap_1_unused":
+        i, n1, n2 = move.args
+        team = solution.solution[i]
+        new_key = team.key ^ team.pizzas[n1].key ^ solution.unused_pizzas[n2].key
+        return solution.fingerprint ^ mix64(team.key) ^ mix64(new_key)
+    i, n1, j, n2 = move.args
+    if i == j:
+        return solution.fingerprint
+    first_team = solution.solution[i]
+    second_team = solution.solution[j]
+    exchanged = first_team.pizzas[n1].key ^ second_team.pizzas[n2].key
+    return (solution.fingerprint ^ mix64(first_team.key) ^ mix64(first_team.key ^ exchanged)
+            ^ mix64(second_team.key) ^ mix64(second_team.key ^ exchanged))
+
+def random_move(solution):
+    """
+    Proposes a move from a randomly chosen neighbour operator.
+
+    Parameters:
+        solution (Solution): Current solution.
+
+    Returns:
+        move (Move): Proposed move, or None if the chosen operator has no valid move.
+    """
+    random_index = random.randint(0, 3)
+    return PROPOSERS[random_index](solution)
+
+def _apply_proposed(solution, curr_score, move):
+    if move is None:
+        return solution, curr_score
+    apply_move(solution, move)
+    return solution, curr_score + move.delta
+
+def swap_pizza_between_teams_random(solution, curr_score):
+    """
+    Switches a pizza between two random teams.
 
     Parameters:
         solution (Solution): Current solution.
         curr_score (float): Current score of the solution.
 
     Returns:
-        solution (Solution): Updated solution with new pizzas.
+        solution (Solution): Updated solution after the swap.
         curr_score (float): Updated score of the solution.
     """
-    free_sizes = []
-    if solution.free[0] > 0 and len(solution.unused_pizzas) > 1:
-        free_sizes.append(0)
-    if solution.free[1] > 0 and len(solution.unused_pizzas) > 2:
-        free_sizes.append(1) 
-    if solution.free[2] > 0 and len(solution.unused_pizzas) > 3:
-        free_sizes.append(2)
-        
-    if len(free_sizes) == 0:
-        return Solution(solution.solution, solution.unused_pizzas, solution.free[0], solution.free[1], solution.free[2]), curr_score
+    return _apply_proposed(solution, curr_score, propose_swap_pizza_between_teams(solution))
 
-    size_team = random.choice(free_sizes)
-    solution.free[size_team] -= 1
-    new_pizzas = solution.unused_pizzas
-    random.shuffle(new_pizzas)
-    team = Delivery(size_team + 2, new_pizzas[:size_team + 2])
+def swap_1_unused(solution, curr_score):
+    """
+    Switches one pizza in a team with an unused one.
 
-    team_score = len(set(ingredient for pizza in team.pizzas for ingredient in pizza.ingredients)) ** 2
-    curr_score = curr_score + team_score
+    Parameters:
+        solution (Solution): Current solution.
+        curr_score (float): Current score of the solution.
 
-    solution.solution.append(team)
-    solution.unused_pizzas = new_pizzas[size_team + 2:]
+    Returns:
+        solution (Solution): Updated solution after the swap.
+        curr_score (float): Updated score of the solution.
+    """
+    return _apply_proposed(solution, curr_score, propose_swap_1_unused(solution))
 
-    return Solution(solution.solution, solution.unused_pizzas, solution.free[0], solution.free[1], solution.free[2]), curr_score
+def new_pizzas(solution, curr_score):
+    """
+    Adds a new set of pizzas to a team.
+
+    Parameters:
+        solution (Solution): Current solution.
+        curr_score (float): Current score of the solution.
+
+    Returns:
+        solution (Solution): Updated solution with new pizzas.
+        curr_score (float): Updated score of the solution.
+    """
+    return _apply_proposed(solution, curr_score, propose_new_pizzas(solution))
 
 def remove_team(solution, curr_score):
     """
@@ -189,22 +471,12 @@ def remove_team(solution, curr_score):
         solution (Solution): Updated solution with the team removed.
         curr_score (float): Updated score of the solution.
     """
-    if len(solution.solution) == 0:
-        return Solution(solution.solution, solution.unused_pizzas, solution.free[0], solution.free[1], solution.free[2]), curr_score
-
-    team = random.choice(solution.solution)
-    solution.free[team.team_size - 2] += 1
-    solution.solution.remove(team)
-    solution.unused_pizzas.extend(team.pizzas)
-
-    team_score = len(set(ingredient for pizza in team.pizzas for ingredient in pizza.ingredients)) ** 2
-    curr_score = curr_score - team_score
-
-    return Solution(solution.solution, solution.unused_pizzas, solution.free[0], solution.free[1], solution.free[2]), curr_score
+    return _apply_proposed(solution, curr_score, propose_remove_team(solution))
 
 def evaluation_function(solution):
     """
     Calculates the evaluation score of a solution.
+    The score is the running total kept by the move operators, so this is O(1).
 
     Parameters:
         solution (Solution): Solution to be evaluated.
@@ -212,26 +484,23 @@ def evaluation_function(solution):
     Returns:
         score (float): Evaluation score of the solution.
     """
-    if len(solution.solution) == 0:
-        return 0
-    return sum(len(set(ingredient for pizza in delivery.pizzas for ingredient in pizza.ingredients)) ** 2 for delivery in solution.solution)
+    return solution.score
 
-def generate_neighbour_random(solution, prev_score=0):
+def generate_neighbour_random(solution, prev_score=0, scheduler=None):
     """
     Generates a random neighbour of the current solution.
 
     Parameters:
         solution (Solution): Current solution.
         prev_score (float): Previous score of the solution.
+        scheduler (OperatorScheduler): Chooses the operator; it is drawn uniformly if None.
 
     Returns:
         solution (Solution): Random neighbour solution.
         score (float): Score of the random neighbour solution.
     """
-    random_index = random.randint(0, 3)
-    random_neighbour_function = [swap_pizza_between_teams_random, new_pizzas, remove_team, swap_1_unused][random_index]
-    solution, score = random_neighbour_function(solution, prev_score)
-    return solution, score
+    move = scheduler.random_move(solution) if scheduler else random_move(solution)
+    return _apply_proposed(solution, prev_score, move)
 
 def generate_neighbour(solution, prev_score=0):
     """
@@ -256,24 +525,71 @@ def generate_neighbour(solution, prev_score=0):
             best_score = new_score
     return best_solution, best_score
 
-def generate_neighbourhood(solution):
+def generate_neighbourhood(solution, size=NEIGHBOURHOOD_SIZE):
     """
-    Generates the neighbourhood of the current solution.
+    Lazily samples the neighbourhood of the current solution as moves. No neighbour
+    is built: each move carries its score delta and only the chosen one needs applying.
+    Moves are valid for the solution as it was when they were yielded. Moves that leave
+    the solution unchanged, or lead to a neighbour already yielded, are dropped by
+    comparing the fingerprints the moves would produce.
 
     Parameters:
         solution (Solution): Current solution.
+        size (int): Number of proposals drawn; operators with no valid move and duplicates yield nothing.
+
+    Yields:
+        move (Move): Candidate move.
+    """
+    seen = {solution.fingerprint}
+    for _ in range(size):
+        move = random_move(solution)
+        if move is None:
+            continue
+        fingerprint = move_fingerprint(solution, move)
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            yield move
+
+def encode_solution(solution):
+    """
+    Packs a solution into bytes: the free team counts, the deliveries as
+    (team size, pizza indices...) and the unused pizza indices, in pool order.
+
+    Parameters:
+        solution (Solution): Solution to encode.
 
     Returns:
-        neighbourhood (list): List of neighbour solutions.
+        data (bytes): Encoded solution.
     """
-    neighbourhood = []
-    random_neighbour_function = [swap_pizza_between_teams_random, new_pizzas, remove_team, swap_1_unused]
-    score = evaluation_function(solution)
-    for function in random_neighbour_function:
-        new_neighbour, new_score = function(copy.deepcopy(solution), score)
-        if str(new_neighbour) != str(solution):
-            neighbourhood.append(new_neighbour)
-    return neighbourhood
+    values = array("i", solution.free)
+    values.append(len(solution.solution))
+    for delivery in solution.solution:
+        values.append(delivery.team_size)
+        values.extend(pizza.index for pizza in delivery.pizzas)
+    values.extend(pizza.index for pizza in solution.unused_pizzas)
+    return values.tobytes()
+
+def decode_solution(data, pizzas):
+    """
+    Rebuilds a solution packed by encode_solution.
+
+    Parameters:
+        data (bytes): Encoded solution.
+        pizzas (list): Pizza objects in file order, as returned by parse_file.
+
+    Returns:
+        solution (Solution): Decoded solution.
+    """
+    values = array("i")
+    values.frombytes(data)
+    position = 4
+    deliveries = []
+    for _ in range(values[3]):
+        team_size = values[position]
+        deliveries.append(Delivery(team_size, [pizzas[index - 1] for index in values[position + 1:position + 1 + team_size]]))
+        position += 1 + team_size
+    unused = [pizzas[index - 1] for index in values[position:]]
+    return Solution(deliveries, unused, values[0], values[1], values[2])
 
 def is_feasible(solution, team_sizes, debug=False):
     """
@@ -287,17 +603,20 @@ def is_feasible(solution, team_sizes, debug=False):
     Returns:
         feasible (bool): True if the solution is feasible, False otherwise.
     """
-    pizzas = []
-    for delivery in solution.solution:
-        for pizza in delivery.pizzas:
-            if pizza.index in pizzas:
-                return False
-            pizzas.append(pizza.index)
-
+    free = list(team_sizes)
+    # Bitmap of delivered pizza indices, sized for the pizzas of the solution (indices start at 1)
+    delivered = bytearray(len(solution.unused_pizzas) + sum(len(delivery.pizzas) for delivery in solution.solution) + 1)
     for delivery in solution.solution:
         delivery_size = delivery.team_size
-        if team_sizes[delivery_size - 2] == 0:
+        if free[delivery_size - 2] == 0:
             return False
-        team_sizes[delivery_size - 2] -= 1
+        free[delivery_size - 2] -= 1
+
+        for pizza in delivery.pizzas:
+            if pizza.index >= len(delivered):
+                delivered.extend(bytes(pizza.index + 1 - len(delivered)))
+            if delivered[pizza.index]:
+                return False
+            delivered[pizza.index] = 1
 
     return True